@@ -4,45 +4,212 @@ Script for printing daily schedule from CalDAV calendar to Word document.
 """
 
 import os
-import platform
+import re
+import sys
+import json
+import hashlib
 import argparse
-from datetime import datetime, timedelta, date, timezone
-from caldav import DAVClient
-from docx import Document
-from docx.shared import Pt, Cm
-from docx.enum.text import WD_ALIGN_PARAGRAPH
+from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from functools import lru_cache, partial
+from operator import itemgetter
+from datetime import datetime, timedelta, date, time, timezone
+from typing import List, Optional, Union
+from xml.sax.saxutils import escape
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9: only numeric offsets are supported
+    ZoneInfo = None
+# caldav and python-docx are slow to import, so they are imported where they are
+# used (connect_to_calendar, save_document, create_word_document_compact)
 from dotenv import load_dotenv
-import vobject
+from lxml import etree
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
 from urllib.parse import urljoin
 
 
+# vCard and iCalendar line folding (RFC 6350, section 3.2; RFC 5545, section 3.1):
+# CRLF followed by a space or tab
+CONTENT_LINE_UNFOLD_RE = re.compile(r'\r?\n[ \t]')
+
+# Backslash escapes in vCard/iCalendar text values, and unescaped N component
+# (semicolon) and value (comma) separators
+TEXT_ESCAPE_RE = re.compile(r'\\(.)')
+COMPONENT_SEPARATOR_RE = re.compile(r'(?<!\\);')
+VALUE_SEPARATOR_RE = re.compile(r'(?<!\\),')
+
+# vCard FN, N and EMAIL properties with optional group prefix and parameters
+VCARD_PROPERTY_RE = re.compile(r'^(?:[\w-]+\.)?(FN|N|EMAIL)(?:;[^:\r\n]*)?:(.*?)\r?$', re.MULTILINE | re.IGNORECASE)
+
+# VEVENT components of an iCalendar object, and the properties used for the schedule
+VEVENT_RE = re.compile(r'^BEGIN:VEVENT\r?$(.*?)^END:VEVENT\r?$', re.MULTILINE | re.DOTALL | re.IGNORECASE)
+VALARM_RE = re.compile(r'^BEGIN:VALARM\r?$.*?^END:VALARM\r?$', re.MULTILINE | re.DOTALL | re.IGNORECASE)
+VEVENT_PROPERTY_RE = re.compile(
+    r'^(DTSTART|DTEND|SUMMARY|LOCATION|ORGANIZER|ATTENDEE|RRULE|RDATE)'
+    r'((?:;[\w-]+=(?:"[^"\r\n]*"|[^;:"\r\n])*)*):(.*?)\r?$',
+    re.MULTILINE | re.IGNORECASE
+)
+ICAL_PARAMETER_RE = re.compile(r';([\w-]+)=((?:"[^"]*"|[^;:"])*)')
+
+# XML namespaces used in CalDAV and CardDAV responses
+DAV_NAMESPACES = {
+    'D': 'DAV:',
+    'C': 'urn:ietf:params:xml:ns:caldav',
+    'E': 'urn:ietf:params:xml:ns:carddav',
+    'CS': 'http://calendarserver.org/ns/'
+}
+
+# Precompiled XPath expressions evaluated against a single D:response element
+HREF_XPATH = etree.XPath('string(D:href)', namespaces=DAV_NAMESPACES)
+DISPLAYNAME_XPATH = etree.XPath('string(.//D:displayname)', namespaces=DAV_NAMESPACES)
+CTAG_XPATH = etree.XPath('string(.//CS:getctag)', namespaces=DAV_NAMESPACES)
+IS_ADDRESSBOOK_XPATH = etree.XPath('boolean(.//D:resourcetype/E:addressbook)', namespaces=DAV_NAMESPACES)
+CONTENTTYPE_XPATH = etree.XPath('string(.//D:getcontenttype)', namespaces=DAV_NAMESPACES)
+GETETAG_XPATH = etree.XPath('string(.//D:getetag)', namespaces=DAV_NAMESPACES)
+ADDRESS_DATA_XPATH = etree.XPath('string(.//E:address-data)', namespaces=DAV_NAMESPACES)
+SYNC_TOKEN_XPATH = etree.XPath('string(.//D:sync-token)', namespaces=DAV_NAMESPACES)
+STATUS_XPATH = etree.XPath('string(D:status)', namespaces=DAV_NAMESPACES)
+CALENDAR_DATA_XPATH = etree.XPath('string(.//C:calendar-data)', namespaces=DAV_NAMESPACES)
+
+# Parsed TIMEZONE_OFFSET values
+TIMEZONE_CACHE = {}
+
+# Explicit hours and minutes TIMEZONE_OFFSET form: +HHMM or +HH:MM (sign required)
+TIMEZONE_HHMM_RE = re.compile(r'^([+-])(\d{2}):?(\d{2})$')
+
+# Date argument formats: integer offset from today, or DD.MM[.YY|.YYYY]
+DATE_OFFSET_RE = re.compile(r'^[+-]?\d+$')
+DATE_ARGUMENT_RE = re.compile(r'^(\d{1,2})\.(\d{1,2})(?:\.(\d{2}|\d{4}))?$')
+DATE_FORMAT_HINT = "Use DD.MM.YY, DD.MM.YYYY, DD.MM, or integer offset (0, -1, +1, etc.)"
+
+# Unicode indicators for attendee participation status (PARTSTAT)
+PARTSTAT_INDICATORS = {
+    'ACCEPTED': '✓',   # Checkmark for accepted
+    'DECLINED': '✗',   # Cross for declined
+    'TENTATIVE': '?',  # Question mark for tentative
+    'DELEGATED': '→',  # Arrow for delegated
+}
+
+# WordprocessingML tags of the rows and runs built directly in the schedule table,
+# in Clark notation as docx.oxml.ns.qn() builds them
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+W_TC = f'{{{W_NS}}}tc'
+W_P = f'{{{W_NS}}}p'
+W_R = f'{{{W_NS}}}r'
+W_RPR = f'{{{W_NS}}}rPr'
+W_B = f'{{{W_NS}}}b'
+W_VAL = f'{{{W_NS}}}val'
+W_T = f'{{{W_NS}}}t'
+W_BR = f'{{{W_NS}}}br'
+XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+
+# Calendar data requested in CalDAV REPORTs: only the VEVENT properties used for
+# the schedule (RRULE and RDATE only to detect a server that did not expand recurrences),
+# with recurring events expanded to the time range
+CALENDAR_DATA_REQUEST = '''<C:calendar-data>
+         <C:comp name="VCALENDAR">
+           <C:prop name="VERSION"/>
+           <C:comp name="VEVENT">
+             <C:prop name="DTSTART"/>
+             <C:prop name="DTEND"/>
+             <C:prop name="SUMMARY"/>
+             <C:prop name="LOCATION"/>
+             <C:prop name="ORGANIZER"/>
+             <C:prop name="ATTENDEE"/>
+             <C:prop name="RRULE"/>
+             <C:prop name="RDATE"/>
+           </C:comp>
+         </C:comp>
+         <C:expand {time_range}/>
+       </C:calendar-data>'''
+
+# Number of time ranges (days) kept in the events cache per calendar
+MAX_CACHED_EVENT_RANGES = 31
+
+# Version of the events cache format: change it whenever the cached event data
+# would differ for the same calendar object, so that old caches are dropped
+EVENTS_CACHE_VERSION = 2
+
+# Maximum number of dates (schedules) generated in one run
+MAX_SCHEDULE_DATES = 31
+
+# Version of the document layout, part of the schedule content hash:
+# change it whenever create_word_document_compact output changes
+DOCUMENT_LAYOUT_VERSION = 1
+
+# Maximum number of addressbooks (or multiget batches) loaded in parallel
+MAX_CARDDAV_WORKERS = 8
+
+# Maximum number of vCards requested in one addressbook-multiget REPORT
+MULTIGET_BATCH_SIZE = 200
+
+# Maximum number of EMAIL prop-filters sent in one addressbook-query REPORT
+EMAIL_QUERY_BATCH_SIZE = 50
+
+# Shared HTTP session for CalDAV and CardDAV requests: keeps connections alive so that
+# PROPFIND and REPORT requests to the same host reuse one TCP/TLS connection.
+# Failed connection attempts are retried with a short backoff.
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=Retry(total=3, backoff_factor=0.3)))
+SESSION.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=Retry(total=3, backoff_factor=0.3)))
+
+
 def parse_timezone_offset(offset_str):
     """Parse timezone offset string to timezone object.
     
     Args:
-        offset_str: String like '+3', '-5', '0', '+5.5' representing hours offset from UTC
+        offset_str: String like '+3', '-5', '0', '+5.5' representing hours offset from UTC,
+                    hours and minutes like '+0530' or '+05:30',
+                    or IANA timezone name like 'Europe/Moscow' (DST-aware, Python 3.9+)
     
     Returns:
         timezone object with the specified offset
     """
+    # Default to +3 (Moscow time) if not specified
+    if not offset_str:
+        offset_str = '+3'
+    
+    offset_str = offset_str.strip()
+    
+    if offset_str in TIMEZONE_CACHE:
+        return TIMEZONE_CACHE[offset_str]
+    
+    tz = None
+    match = TIMEZONE_HHMM_RE.match(offset_str)
+    
+    # timezone() rejects offsets of 24 hours or more with ValueError; every such
+    # failure ends in the same invalid-offset error below
     try:
-        # Default to +3 (Moscow time) if not specified
-        if not offset_str:
-            offset_str = '+3'
-        
-        # Parse the offset as float to support half-hour offsets
-        offset_hours = float(offset_str)
-        
-        # Create timezone with the offset
-        tz = timezone(timedelta(hours=offset_hours))
-        return tz
-    except ValueError:
+        if match:
+            sign, hours, minutes = match.groups()
+            if int(minutes) < 60:
+                offset = timedelta(hours=int(hours), minutes=int(minutes))
+                tz = timezone(-offset if sign == '-' else offset)
+        else:
+            # Parse the offset as float to support half-hour offsets
+            tz = timezone(timedelta(hours=float(offset_str)))
+    except (ValueError, OverflowError):
+        tz = None
+    
+    if tz is None and ZoneInfo is not None and not match:
+        try:
+            tz = ZoneInfo(offset_str)
+        except (KeyError, ValueError, OSError):
+            pass
+    
+    if tz is None:
         raise ValueError(
             f"Invalid timezone offset: '{offset_str}'. "
-            "Use numeric offset in hours, e.g., +3, -5, 0, +5.5"
+            "Use numeric offset in hours, e.g., +3, -5, 0, +5.5, "
+            "hours and minutes, e.g., +0530 or +05:30, or timezone name, e.g., Europe/Moscow"
         )
+    
+    TIMEZONE_CACHE[offset_str] = tz
+    return tz
 
 
 def load_config():
@@ -52,10 +219,27 @@ def load_config():
     caldav_username = os.getenv('CALDAV_USERNAME')
     caldav_password = os.getenv('CALDAV_PASSWORD')
     
+    # Contacts and events cache paths (empty value disables caching)
+    contacts_cache_path = os.getenv('CONTACTS_CACHE_PATH', '~/.cache/printschedule/contacts.json')
+    if contacts_cache_path:
+        contacts_cache_path = os.path.expanduser(contacts_cache_path)
+    events_cache_path = os.getenv('EVENTS_CACHE_PATH', '~/.cache/printschedule/events.json')
+    if events_cache_path:
+        events_cache_path = os.path.expanduser(events_cache_path)
+    
     # Parse timezone offset
     timezone_offset = os.getenv('TIMEZONE_OFFSET', '+3')
     tz = parse_timezone_offset(timezone_offset)
     
+    # Zip compression level of the saved document (empty: python-docx default)
+    compression_level = os.getenv('DOCX_COMPRESSION_LEVEL', '').strip()
+    if compression_level:
+        if not compression_level.isdigit() or int(compression_level) > 9:
+            raise ValueError(f"Invalid DOCX_COMPRESSION_LEVEL '{compression_level}', expected 0-9")
+        compression_level = int(compression_level)
+    else:
+        compression_level = None
+    
     config = {
         'caldav_url': os.getenv('CALDAV_URL'),
         'caldav_username': caldav_username,
@@ -66,7 +250,10 @@ def load_config():
         'timezone': tz,
         'document_title': os.getenv('DOCUMENT_TITLE', 'Расписание'),
         'output_path': os.getenv('OUTPUT_PATH', '.'),
-        'filename_prefix': os.getenv('FILENAME_PREFIX', 'schedule_')
+        'filename_prefix': os.getenv('FILENAME_PREFIX', 'schedule_'),
+        'compression_level': compression_level,
+        'contacts_cache_path': contacts_cache_path,
+        'events_cache_path': events_cache_path
     }
     
     # Check if all required parameters are present
@@ -86,12 +273,19 @@ def load_config():
 def connect_to_calendar(caldav_url, username, password):
     """Connect to CalDAV server and return calendar."""
     try:
+        from caldav import DAVClient
+        
         client = DAVClient(
             url=caldav_url,
             username=username,
             password=password
         )
         
+        # Send CalDAV requests through the shared session, so that the principal,
+        # calendar discovery and event queries reuse the same connections
+        client.session.close()
+        client.session = SESSION
+        
         principal = client.principal()
         calendars = principal.calendars()
         
@@ -105,72 +299,302 @@ def connect_to_calendar(caldav_url, username, password):
         raise ConnectionError(f"Failed to connect to CalDAV server: {str(e)}")
 
 
-def discover_addressbooks(addressbook_home_url, username, password):
-    """Discover all available addressbooks from CardDAV addressbook home URL."""
-    from xml.etree import ElementTree as ET
+def iter_dav_responses(response, tags=('{DAV:}response',)):
+    """Stream-parse a WebDAV multistatus response body.
+    
+    Yields D:response elements (or other elements listed in tags) one at a
+    time while the body is still being received; each element is discarded
+    after it has been processed, so memory usage does not grow with the size
+    of the response.
     
+    Args:
+        response: requests.Response obtained with stream=True
+        tags: Qualified names of the elements to yield
+    """
+    # Let urllib3 transparently decompress gzip/deflate bodies
+    response.raw.decode_content = True
+    
+    context = etree.iterparse(
+        response.raw,
+        events=('end',),
+        tag=tags,
+        resolve_entities=False
+    )
+    
+    for _, elem in context:
+        yield elem
+        # Drop the processed element and everything before it from the tree
+        elem.clear(keep_tail=True)
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+
+def discover_addressbooks(addressbook_home_url, username, password, log=print):
+    """Discover all available addressbooks from CardDAV addressbook home URL.
+    
+    Each addressbook is returned with its collection CTag (if the server
+    supports it), which is used to validate the on-disk contacts cache.
+    Warnings are reported through log (print by default).
+    """
     try:
         # Direct PROPFIND to addressbook home to get list of addressbooks
         propfind_books = '''<?xml version='1.0'?>
-<D:propfind xmlns:D="DAV:">
+<D:propfind xmlns:D="DAV:" xmlns:CS="http://calendarserver.org/ns/">
   <D:prop>
     <D:resourcetype />
     <D:displayname />
+    <CS:getctag />
   </D:prop>
 </D:propfind>'''
         
-        response = requests.request(
+        addressbooks = []
+        with SESSION.request(
             'PROPFIND',
             addressbook_home_url,
             headers={'Depth': '1', 'Content-Type': 'application/xml; charset=utf-8'},
             data=propfind_books,
             auth=HTTPBasicAuth(username, password),
-            timeout=30
-        )
-        
-        if response.status_code not in [200, 207]:
-            print(f"Warning: PROPFIND to addressbook home failed with status {response.status_code}")
-            return []
-        
-        root = ET.fromstring(response.content)
-        ns_full = {'D': 'DAV:', 'E': 'urn:ietf:params:xml:ns:carddav'}
-        
-        addressbooks = []
-        for resp in root.findall('D:response', ns_full):
-            # Check if it's an addressbook
-            resourcetype = resp.find('.//D:resourcetype', ns_full)
-            if resourcetype is not None:
-                # Look for addressbook resourcetype
-                is_addressbook = resourcetype.find('E:addressbook', ns_full) is not None
+            timeout=30,
+            stream=True
+        ) as response:
+            if response.status_code not in [200, 207]:
+                log(f"Warning: PROPFIND to addressbook home failed with status {response.status_code}")
+                return []
+            
+            for resp in iter_dav_responses(response):
+                # Check if it's an addressbook
+                if not IS_ADDRESSBOOK_XPATH(resp):
+                    continue
                 
-                if is_addressbook:
-                    href_elem = resp.find('D:href', ns_full)
-                    displayname_elem = resp.find('.//D:displayname', ns_full)
+                href_text = HREF_XPATH(resp)
+                if href_text:
+                    # Build full URL from href
+                    if href_text.startswith('http'):
+                        book_url = href_text
+                    else:
+                        book_url = urljoin(addressbook_home_url, href_text)
                     
-                    if href_elem is not None and href_elem.text:
-                        # Build full URL from href
-                        href_text = href_elem.text
-                        if href_text.startswith('http'):
-                            book_url = href_text
-                        else:
-                            book_url = urljoin(addressbook_home_url, href_text)
-                        
-                        book_name = displayname_elem.text if displayname_elem is not None and displayname_elem.text else 'Unknown'
-                        addressbooks.append({'url': book_url, 'name': book_name})
+                    book_name = DISPLAYNAME_XPATH(resp) or 'Unknown'
+                    book_ctag = CTAG_XPATH(resp) or None
+                    addressbooks.append({'url': book_url, 'name': book_name, 'ctag': book_ctag})
         
         return addressbooks
     
     except Exception as e:
-        print(f"Warning: Failed to discover addressbooks: {str(e)}")
+        log(f"Warning: Failed to discover addressbooks: {str(e)}")
         return []
 
 
-def load_contacts_from_addressbook(addressbook_url, username, password):
-    """Load contacts from a specific addressbook using addressbook-multiget."""
-    from xml.etree import ElementTree as ET
+def unescape_text_value(value):
+    """Unescape vCard/iCalendar text value (backslash-escaped commas, semicolons and newlines)."""
+    if '\\' not in value:
+        return value
+    return TEXT_ESCAPE_RE.sub(lambda m: '\n' if m.group(1) in 'nN' else m.group(1), value)
+
+
+def parse_vcard_contact(vcard_text):
+    """Extract full name and email addresses from vCard text.
+    
+    Only the FN, N and EMAIL properties are needed, so the vCard is scanned
+    with a regular expression instead of being fully parsed.
+    
+    Returns:
+        tuple: (full_name, emails) where emails are lowercased;
+               (None, []) if the vCard has no name or can't be parsed
+    """
+    try:
+        # Unfold continuation lines before scanning
+        text = CONTENT_LINE_UNFOLD_RE.sub('', vcard_text)
+        
+        formatted_name = None
+        structured_name = None
+        emails = []
+        
+        for match in VCARD_PROPERTY_RE.finditer(text):
+            prop = match.group(1).upper()
+            value = match.group(2).strip()
+            
+            if prop == 'EMAIL':
+                email_value = unescape_text_value(value).lower().strip()
+                if email_value:
+                    emails.append(email_value)
+            elif prop == 'N' and structured_name is None:
+                structured_name = value
+            elif prop == 'FN' and formatted_name is None:
+                formatted_name = value
+        
+        # Get full name - prioritize structured name (N) over full name (FN)
+        full_name = None
+        
+        # First, try to build name from structured components (Family, Given, Middle/Additional)
+        if structured_name:
+            # Components are separated by unescaped semicolons, multiple values by commas
+            components = [
+                ' '.join(part.strip() for part in VALUE_SEPARATOR_RE.split(component) if part.strip())
+                for component in COMPONENT_SEPARATOR_RE.split(structured_name)
+            ]
+            family, given, additional = (components + ['', '', ''])[:3]
+            # Check if at least family or given name is present
+            if family or given:
+                name_parts = [
+                    unescape_text_value(part) for part in (family, given, additional) if part
+                ]
+                full_name = ' '.join(name_parts).strip()
+        
+        # If structured name is empty, fall back to full name (FN)
+        if not full_name and formatted_name:
+            full_name = unescape_text_value(formatted_name).strip()
+        
+        # Skip contacts without names
+        if not full_name:
+            return None, []
+        
+        return full_name, emails
+    
+    except Exception:
+        # Skip contacts that can't be parsed
+        return None, []
+
+
+def query_contacts_by_email(addressbook_url, emails, username, password, log=print):
+    """Look up contacts for specific email addresses using addressbook-query.
     
+    A REPORT with one EMAIL prop-filter per address is sent (in batches of
+    EMAIL_QUERY_BATCH_SIZE), so only the matching vCards are transferred
+    instead of the whole addressbook.
+    
+    Returns:
+        dict: email to name mapping for the found contacts,
+              or None if the server rejected the query
+    """
     email_to_name = {}
     
+    if not emails:
+        return email_to_name
+    
+    # Servers may limit the size of a filter, so large sets are queried in batches
+    sorted_emails = sorted(emails)
+    batches = [
+        sorted_emails[i:i + EMAIL_QUERY_BATCH_SIZE]
+        for i in range(0, len(sorted_emails), EMAIL_QUERY_BATCH_SIZE)
+    ]
+    
+    try:
+        for batch in batches:
+            prop_filters = '\n'.join([
+                '<A:prop-filter name="EMAIL">'
+                f'<A:text-match collation="i;unicode-casemap" match-type="equals">{escape(email)}</A:text-match>'
+                '</A:prop-filter>'
+                for email in batch
+            ])
+            
+            query_body = f'''<?xml version="1.0" encoding="utf-8" ?>
+   <A:addressbook-query xmlns:D="DAV:" xmlns:A="urn:ietf:params:xml:ns:carddav">
+     <D:prop>
+       <D:getetag/>
+       <A:address-data/>
+     </D:prop>
+     <A:filter test="anyof">
+     {prop_filters}
+     </A:filter>
+   </A:addressbook-query>'''
+            
+            with SESSION.request(
+                'REPORT',
+                addressbook_url,
+                headers={'Depth': '1', 'Content-Type': 'application/xml; charset=utf-8'},
+                data=query_body.encode('utf-8'),
+                auth=HTTPBasicAuth(username, password),
+                timeout=30,
+                stream=True
+            ) as response:
+                if response.status_code not in [200, 207]:
+                    log(f"Warning: REPORT addressbook-query failed with status {response.status_code}")
+                    return None
+                
+                for resp in iter_dav_responses(response):
+                    address_data = ADDRESS_DATA_XPATH(resp)
+                    if address_data:
+                        full_name, card_emails = parse_vcard_contact(address_data)
+                        for email_value in card_emails:
+                            email_to_name[email_value] = full_name
+    
+    except Exception as e:
+        log(f"Warning: Failed to query contacts from addressbook: {str(e)}")
+        return None
+    
+    return email_to_name
+
+
+def multiget_addressbook_cards(addressbook_url, hrefs, username, password, log=print):
+    """Fetch the given vCards with a single addressbook-multiget REPORT.
+    
+    Returns:
+        dict: {href: [full_name, emails]}, or None if the request failed
+    """
+    cards = {}
+    
+    href_elements = ''.join([f'<D:href>{escape(href)}</D:href>' for href in hrefs])
+    
+    multiget_body = f'''<?xml version="1.0" encoding="utf-8" ?>
+   <A:addressbook-multiget xmlns:D="DAV:" xmlns:A="urn:ietf:params:xml:ns:carddav">
+     <D:prop>
+       <D:getetag/>
+       <D:getcontenttype/>
+       <A:address-data/>
+     </D:prop>
+     {href_elements}
+   </A:addressbook-multiget>'''
+    
+    try:
+        with SESSION.request(
+            'REPORT',
+            addressbook_url,
+            headers={'Depth': '1', 'Content-Type': 'application/xml; charset=utf-8'},
+            data=multiget_body.encode('utf-8'),
+            auth=HTTPBasicAuth(username, password),
+            timeout=60,
+            stream=True
+        ) as response:
+            if response.status_code not in [200, 207]:
+                log(f"Warning: REPORT addressbook-multiget failed with status {response.status_code}")
+                return None
+            
+            # Parse response and extract vCards as they arrive
+            for resp in iter_dav_responses(response):
+                address_data = ADDRESS_DATA_XPATH(resp)
+                if address_data:
+                    full_name, emails = parse_vcard_contact(address_data)
+                    if full_name:
+                        cards[HREF_XPATH(resp)] = [full_name, emails]
+    
+    except Exception as e:
+        log(f"Warning: Failed to load contacts from addressbook: {str(e)}")
+        return None
+    
+    return cards
+
+
+def load_contacts_from_addressbook(addressbook_url, username, password, cached_cards=None, cached_etags=None,
+                                   log=print):
+    """Load contacts from a specific addressbook using addressbook-multiget.
+    
+    vCards are requested in batches of MULTIGET_BATCH_SIZE, several at a time,
+    so that no single response grows with the size of the addressbook.
+    vCards whose ETag matches cached_etags are taken from cached_cards
+    instead of being downloaded again.
+    
+    Returns:
+        tuple: (cards, sync_token, etags) where cards maps vCard href to
+               [full_name, emails], sync_token is the collection sync-token
+               (None if not supported) and etags maps vCard href to its ETag
+    """
+    cards = {}
+    sync_token = None
+    etags = {}
+    cached_cards = cached_cards or {}
+    cached_etags = cached_etags or {}
+    
     try:
         # Step 1: PROPFIND to get list of all contacts (hrefs)
         propfind_body = '''<?xml version='1.0'?>
@@ -178,126 +602,345 @@ def load_contacts_from_addressbook(addressbook_url, username, password):
   <D:prop>
     <D:getetag/>
     <D:getcontenttype/>
+    <D:sync-token/>
   </D:prop>
 </D:propfind>'''
         
-        response = requests.request(
+        # Collect hrefs of new and changed vCards
+        vcard_hrefs = []
+        reused = 0
+        with SESSION.request(
             'PROPFIND',
             addressbook_url,
             headers={'Depth': '1', 'Content-Type': 'application/xml; charset=utf-8'},
             data=propfind_body,
             auth=HTTPBasicAuth(username, password),
-            timeout=30
-        )
+            timeout=30,
+            stream=True
+        ) as response:
+            if response.status_code not in [200, 207]:
+                return cards, sync_token, etags
+            
+            for resp in iter_dav_responses(response):
+                # Sync-token is reported for the addressbook collection itself
+                if not sync_token:
+                    sync_token = SYNC_TOKEN_XPATH(resp) or None
+                
+                if 'vcard' in CONTENTTYPE_XPATH(resp).lower():
+                    # The addressbook collection itself may report a vCard content type
+                    href_text = HREF_XPATH(resp)
+                    if not href_text or href_text.endswith('/'):
+                        continue
+                    
+                    etag = GETETAG_XPATH(resp)
+                    if etag:
+                        etags[href_text] = etag
+                    
+                    # Unchanged vCard: reuse the cached contact
+                    if etag and cached_etags.get(href_text) == etag:
+                        reused += 1
+                        if href_text in cached_cards:
+                            cards[href_text] = cached_cards[href_text]
+                        continue
+                    
+                    vcard_hrefs.append(href_text)
         
-        if response.status_code not in [200, 207]:
-            return email_to_name
+        if reused:
+            log(f"  {reused} unchanged vCard(s) reused from cache")
+        
+        if not vcard_hrefs:
+            return cards, sync_token, etags
         
-        root = ET.fromstring(response.content)
-        ns = {'D': 'DAV:'}
+        # Step 2: Fetch vCards with addressbook-multiget in bounded batches, concurrently
+        batches = [
+            vcard_hrefs[i:i + MULTIGET_BATCH_SIZE]
+            for i in range(0, len(vcard_hrefs), MULTIGET_BATCH_SIZE)
+        ]
         
-        # Collect all vCard hrefs
-        vcard_hrefs = []
-        for resp in root.findall('D:response', ns):
-            contenttype = resp.find('.//D:getcontenttype', ns)
-            if contenttype is not None and contenttype.text and 'vcard' in contenttype.text.lower():
-                href_elem = resp.find('D:href', ns)
-                if href_elem is not None and href_elem.text:
-                    vcard_hrefs.append(href_elem.text)
+        # Each batch collects its own messages, which are passed on in batch order
+        batch_messages = [[] for _ in batches]
+        with ThreadPoolExecutor(max_workers=min(MAX_CARDDAV_WORKERS, len(batches))) as executor:
+            results = list(executor.map(
+                lambda batch, messages: multiget_addressbook_cards(
+                    addressbook_url, batch, username, password, log=messages.append
+                ),
+                batches,
+                batch_messages
+            ))
         
-        if not vcard_hrefs:
-            return email_to_name
+        for messages in batch_messages:
+            for message in messages:
+                log(message)
         
-        # Step 2: Use addressbook-multiget to fetch all vCards at once
-        href_elements = '\n'.join([f'<D:href>{href}</D:href>' for href in vcard_hrefs])
+        # Don't return a partial addressbook if any of the batches failed
+        if any(batch_cards is None for batch_cards in results):
+            return {}, None, {}
         
-        multiget_body = f'''<?xml version="1.0" encoding="utf-8" ?>
-   <A:addressbook-multiget xmlns:D="DAV:" xmlns:A="urn:ietf:params:xml:ns:carddav">
+        for batch_cards in results:
+            cards.update(batch_cards)
+    
+    except Exception as e:
+        log(f"Warning: Failed to load contacts from addressbook: {str(e)}")
+        return {}, None, {}
+    
+    return cards, sync_token, etags
+
+
+def sync_addressbook_cards(addressbook_url, sync_token, cards, etags, username, password, log=print):
+    """Apply changes made since sync_token to cards using sync-collection (RFC 6578).
+    
+    Args:
+        cards: Previously loaded cards, {href: [full_name, emails]}
+        etags: ETags of the previously loaded cards, {href: etag}
+    
+    Returns:
+        tuple: (cards, sync_token, etags) with the changes applied and the new sync-token,
+               or None if the server doesn't support sync or the token has expired
+    """
+    sync_body = f'''<?xml version="1.0" encoding="utf-8" ?>
+   <D:sync-collection xmlns:D="DAV:" xmlns:A="urn:ietf:params:xml:ns:carddav">
+     <D:sync-token>{escape(sync_token)}</D:sync-token>
+     <D:sync-level>1</D:sync-level>
      <D:prop>
        <D:getetag/>
-       <D:getcontenttype/>
        <A:address-data/>
      </D:prop>
-     {href_elements}
-   </A:addressbook-multiget>'''
-        
-        response = requests.request(
+   </D:sync-collection>'''
+    
+    cards = dict(cards)
+    etags = dict(etags)
+    new_token = None
+    changes = 0
+    
+    try:
+        with SESSION.request(
             'REPORT',
             addressbook_url,
-            headers={'Depth': '1', 'Content-Type': 'application/xml; charset=utf-8'},
-            data=multiget_body,
+            headers={'Content-Type': 'application/xml; charset=utf-8'},
+            data=sync_body.encode('utf-8'),
             auth=HTTPBasicAuth(username, password),
-            timeout=60
-        )
-        
-        if response.status_code not in [200, 207]:
-            print(f"Warning: REPORT addressbook-multiget failed with status {response.status_code}")
-            return email_to_name
-        
-        # Parse response and extract vCards
-        root = ET.fromstring(response.content)
-        ns_full = {'D': 'DAV:', 'E': 'urn:ietf:params:xml:ns:carddav'}
-        
-        for resp in root.findall('D:response', ns_full):
-            address_data = resp.find('.//E:address-data', ns_full)
-            if address_data is not None and address_data.text:
-                try:
-                    # Parse vCard
-                    vcard = vobject.readOne(address_data.text)
-                    
-                    # Get full name - prioritize structured name (N) over full name (FN)
-                    full_name = None
-                    
-                    # First, try to build name from structured components (Family, Given, Middle/Additional)
-                    if hasattr(vcard, 'n'):
-                        n = vcard.n.value
-                        # Check if at least family or given name is present
-                        if n.family or n.given:
-                            name_parts = []
-                            if n.family:
-                                name_parts.append(n.family)
-                            if n.given:
-                                name_parts.append(n.given)
-                            if n.additional:
-                                name_parts.append(n.additional)
-                            full_name = ' '.join(name_parts).strip()
-                    
-                    # If structured name is empty, fall back to full name (FN)
-                    if not full_name and hasattr(vcard, 'fn') and vcard.fn.value:
-                        full_name = str(vcard.fn.value).strip()
-                    
-                    # Skip contacts without names
-                    if not full_name:
-                        continue
-                    
-                    # Get email addresses
-                    if hasattr(vcard, 'email_list'):
-                        for email in vcard.email_list:
-                            email_value = str(email.value).lower().strip()
-                            if email_value:
-                                email_to_name[email_value] = full_name
-                    elif hasattr(vcard, 'email'):
-                        email_value = str(vcard.email.value).lower().strip()
-                        if email_value:
-                            email_to_name[email_value] = full_name
+            timeout=60,
+            stream=True
+        ) as response:
+            if response.status_code not in [200, 207]:
+                return None
+            
+            for elem in iter_dav_responses(response, tags=('{DAV:}response', '{DAV:}sync-token')):
+                if elem.tag == '{DAV:}sync-token':
+                    new_token = elem.text
+                    continue
                 
-                except Exception:
-                    # Skip contacts that can't be parsed
+                href_text = HREF_XPATH(elem)
+                if not href_text:
                     continue
+                
+                changes += 1
+                address_data = ADDRESS_DATA_XPATH(elem)
+                full_name, emails = parse_vcard_contact(address_data) if address_data else (None, [])
+                
+                # Removed vCards are reported with a 404 status and no data
+                if full_name and ' 404 ' not in STATUS_XPATH(elem):
+                    cards[href_text] = [full_name, emails]
+                else:
+                    cards.pop(href_text, None)
+                
+                etag = GETETAG_XPATH(elem)
+                if etag and ' 404 ' not in STATUS_XPATH(elem):
+                    etags[href_text] = etag
+                else:
+                    etags.pop(href_text, None)
     
     except Exception as e:
-        print(f"Warning: Failed to load contacts from addressbook: {str(e)}")
+        log(f"Warning: Failed to synchronize addressbook: {str(e)}")
+        return None
+    
+    if not new_token:
+        return None
     
+    log(f"  {changes} changed vCard(s) synchronized")
+    return cards, new_token, etags
+
+
+def cards_to_email_to_name(cards):
+    """Build email to name mapping from cards, {href: [full_name, emails]}."""
+    email_to_name = {}
+    for full_name, emails in cards.values():
+        for email_value in emails:
+            email_to_name[email_value] = full_name
     return email_to_name
 
 
-def load_contacts_from_carddav(carddav_url, username, password):
-    """Load all contacts from all CardDAV addressbooks and create email to name mapping."""
+def load_json_cache(cache_path):
+    """Load a cache file (contacts or events) from disk.
+    
+    Returns:
+        dict: cached data, empty if cache_path is not set or there is no valid cache
+    """
+    if not cache_path:
+        return {}
+    
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"Warning: Failed to read cache '{cache_path}': {str(e)}")
+        return {}
+
+
+def save_json_cache(cache_path, cache):
+    """Save a cache file to disk, creating its directory if needed.
+    
+    The file is written to a temporary file first and then replaced atomically,
+    so an interrupted run never leaves a truncated cache behind.
+    """
+    if not cache_path:
+        return
+    
+    tmp_path = cache_path + '.tmp'
+    try:
+        cache_dir = os.path.dirname(cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        print(f"Warning: Failed to write cache '{cache_path}': {str(e)}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def load_addressbook_contacts(addressbook, entry, emails, username, password):
+    """Load email to name mappings of one addressbook, reusing its cache entry if valid.
+    
+    Args:
+        addressbook: Addressbook dict from discover_addressbooks
+        entry: Cached entry for this addressbook (or None)
+        emails: Set of lowercased emails to look up, or None to load all contacts
+    
+    Progress lines and warnings are collected instead of printed, so that
+    addressbooks loaded in parallel don't interleave their output.
+    
+    Returns:
+        tuple: (entry, changed, messages) - the up-to-date cache entry, whether it
+               needs saving and the messages to print for this addressbook
+    """
+    messages = []
+    log = messages.append
+    ctag = addressbook['ctag']
+    previous = entry
+    
+    # Cached mappings are valid only while the addressbook has not changed
+    if not ctag or not entry or entry.get('ctag') != ctag:
+        entry = {'ctag': ctag, 'email_to_name': {}, 'not_found': [], 'complete': False}
+    
+    full_download = False
+    entry_changed = False
+    
+    if entry['complete']:
+        log(f"Using cached contacts for '{addressbook['name']}'")
+    elif previous and previous.get('complete') and previous.get('sync_token'):
+        # Addressbook has changed since the last full download, fetch only the changes
+        full_download = True
+    elif emails is None:
+        full_download = True
+    else:
+        # Only ask the server about addresses not resolved by a previous run
+        pending = emails - set(entry['email_to_name']) - set(entry['not_found'])
+        if not pending:
+            log(f"Using cached contacts for '{addressbook['name']}'")
+        else:
+            log(f"Looking up {len(pending)} email(s) in '{addressbook['name']}'...")
+            found = query_contacts_by_email(addressbook['url'], pending, username, password, log=log)
+            
+            if found is None:
+                # Server doesn't support addressbook-query, fall back to full download
+                full_download = True
+            else:
+                entry['email_to_name'] = {**entry['email_to_name'], **found}
+                entry['not_found'] = sorted(set(entry['not_found']) | (pending - set(found)))
+                entry_changed = True
+    
+    if full_download:
+        synced = None
+        if previous and previous.get('complete') and previous.get('sync_token'):
+            log(f"Synchronizing contacts in '{addressbook['name']}'...")
+            synced = sync_addressbook_cards(
+                addressbook['url'],
+                previous['sync_token'],
+                previous.get('cards', {}),
+                previous.get('etags', {}),
+                username,
+                password,
+                log=log
+            )
+        
+        if synced is not None:
+            cards, sync_token, etags = synced
+        else:
+            # Cards of a previous full download are revalidated by ETag
+            cached_cards, cached_etags = {}, {}
+            if previous and previous.get('complete'):
+                cached_cards, cached_etags = previous.get('cards', {}), previous.get('etags', {})
+            
+            log(f"Loading contacts from '{addressbook['name']}'...")
+            cards, sync_token, etags = load_contacts_from_addressbook(
+                addressbook['url'],
+                username,
+                password,
+                cached_cards,
+                cached_etags,
+                log=log
+            )
+        
+        # A full download covers every address in the addressbook
+        entry = {
+            'ctag': ctag,
+            'email_to_name': cards_to_email_to_name(cards),
+            'not_found': [],
+            'complete': True,
+            'sync_token': sync_token,
+            'cards': cards,
+            'etags': etags
+        }
+        # An empty result may mean a failed load, so it is not cached
+        entry_changed = bool(cards)
+    
+    # Only cache addressbooks that provide a CTag to validate against
+    return entry, entry_changed and bool(ctag), messages
+
+
+def load_contacts_from_carddav(carddav_url, username, password, emails=None, cache_path=None, addressbooks=None,
+                               refresh=False):
+    """Load contacts from all CardDAV addressbooks and create email to name mapping.
+    
+    If emails is given, only those addresses are looked up (via addressbook-query);
+    otherwise every vCard of every addressbook is downloaded.
+    
+    If cache_path is given, results are cached on disk per addressbook and
+    reused for as long as the addressbook CTag does not change. With refresh,
+    cached entries are ignored and replaced with freshly loaded ones.
+    
+    If addressbooks is given (result of discover_addressbooks), discovery is
+    skipped. Addressbooks are loaded in parallel.
+    """
     email_to_name = {}
     
+    if emails is not None:
+        emails = {email.lower() for email in emails}
+        if not emails:
+            print("No attendees to resolve, skipping contact lookup")
+            return email_to_name
+    
     try:
         # Discover all addressbooks
-        addressbooks = discover_addressbooks(carddav_url, username, password)
+        if addressbooks is None:
+            addressbooks = discover_addressbooks(carddav_url, username, password)
         
         if not addressbooks:
             print("Warning: No addressbooks found")
@@ -305,279 +948,713 @@ def load_contacts_from_carddav(carddav_url, username, password):
         
         print(f"Found {len(addressbooks)} addressbook(s): {', '.join([ab['name'] for ab in addressbooks])}")
         
-        # Load contacts from each addressbook
-        for addressbook in addressbooks:
-            print(f"Loading contacts from '{addressbook['name']}'...")
-            book_contacts = load_contacts_from_addressbook(
-                addressbook['url'],
-                username,
-                password
-            )
+        # Cache: {addressbook_url: {'ctag', 'email_to_name', 'not_found', 'complete',
+        # and for fully downloaded addressbooks also 'sync_token', 'cards', 'etags'}}
+        cache = load_json_cache(cache_path)
+        
+        # Load contacts from all addressbooks concurrently
+        with ThreadPoolExecutor(max_workers=min(MAX_CARDDAV_WORKERS, len(addressbooks))) as executor:
+            results = list(executor.map(
+                lambda ab: load_addressbook_contacts(
+                    ab, None if refresh else cache.get(ab['url']), emails, username, password
+                ),
+                addressbooks
+            ))
+        
+        cache_changed = False
+        for addressbook, (entry, entry_changed, messages) in zip(addressbooks, results):
+            # Printed here rather than by the worker threads, so lines don't interleave
+            for message in messages:
+                print(message)
+            print(f"  '{addressbook['name']}': {len(entry['email_to_name'])} email mappings")
+            
+            if entry_changed:
+                cache[addressbook['url']] = entry
+                cache_changed = True
             
             # Merge contacts (later addressbooks override earlier ones)
-            email_to_name.update(book_contacts)
-            print(f"  Loaded {len(book_contacts)} email mappings")
+            email_to_name.update(entry['email_to_name'])
+        
+        if cache_changed:
+            save_json_cache(cache_path, cache)
         
         print(f"Total: {len(email_to_name)} unique email mappings loaded")
     
-    except Exception as e:
-        print(f"Warning: Failed to load contacts from CardDAV: {str(e)}")
+    except Exception as e:
+        print(f"Warning: Failed to load contacts from CardDAV: {str(e)}")
+    
+    return email_to_name
+
+
+def print_document(filepath):
+    """Print document to default printer (Windows only).
+    
+    Printing is started asynchronously; the function does not wait for the
+    print job to finish.
+    
+    Args:
+        filepath: Full path to the document to print
+    
+    Returns:
+        bool: True if printing was initiated successfully, False otherwise
+    """
+    # Check if running on Windows
+    if sys.platform != 'win32':
+        print("Warning: Automatic printing is only supported on Windows")
+        return False
+    
+    try:
+        # Use os.startfile with 'print' verb to print the document
+        # This opens the document with the default print action. It is a
+        # ShellExecute call without SEE_MASK_NOASYNC: it returns as soon as the
+        # verb is handed to the associated application, so the script does not
+        # wait for the document to be printed or spooled
+        os.startfile(filepath, 'print')
+        print(f"Document sent to default printer: {filepath}")
+        return True
+    except Exception as e:
+        print(f"Error printing document: {str(e)}")
+        return False
+
+
+def parse_date_argument(date_arg):
+    """Parse date argument from command line.
+    
+    Supported formats:
+    - DD.MM.YY or DD.MM.YYYY - specific date
+    - DD.MM - day and month of current year
+    - integer (0, -1, +1, etc.) - offset from today
+    """
+    today = datetime.now().date()
+    
+    if not date_arg:
+        return today
+    
+    date_arg = date_arg.strip()
+    
+    # Integer offset from today
+    if DATE_OFFSET_RE.match(date_arg):
+        return today + timedelta(days=int(date_arg))
+    
+    # Date string: DD.MM, DD.MM.YY or DD.MM.YYYY
+    match = DATE_ARGUMENT_RE.match(date_arg)
+    if match:
+        day, month, year = match.groups()
+        if year is None:
+            year = today.year
+        elif len(year) == 2:
+            # Same two-digit year pivot as strptime's %y: 69-99 -> 19xx, 00-68 -> 20xx
+            year = int(year)
+            year += 1900 if year >= 69 else 2000
+        try:
+            return date(int(year), int(month), int(day))
+        except ValueError:
+            pass
+    
+    # If nothing worked, raise error
+    raise ValueError(f"Invalid date format: '{date_arg}'. {DATE_FORMAT_HINT}")
+
+
+def parse_date_arguments(date_arg):
+    """Parse a list of dates and date ranges from command line.
+    
+    Items are separated by commas; each item is a date in any format accepted
+    by parse_date_argument, or a range FROM..TO (both ends included), e.g.
+    "15.11..21.11" or "0,+1". Duplicates are dropped, order is kept.
+    
+    An empty argument means today; empty items ("0,", "1,,2") are rejected.
+    
+    Returns:
+        list of dates
+    """
+    date_arg = (date_arg or '').strip()
+    if not date_arg:
+        return [parse_date_argument(date_arg)]
+    
+    target_dates = []
+    
+    for item in date_arg.split(','):
+        item = item.strip()
+        parts = [part.strip() for part in item.split('..', 1)]
+        if not all(parts):
+            raise ValueError(f"Invalid date format: '{item}'. {DATE_FORMAT_HINT}")
+        
+        if len(parts) == 2:
+            first, last = (parse_date_argument(part) for part in parts)
+            if last < first:
+                raise ValueError(f"Invalid date range: '{item}' ends before it starts")
+            days = (last - first).days + 1
+        else:
+            first, days = parse_date_argument(item), 1
+        
+        if len(target_dates) + days > MAX_SCHEDULE_DATES:
+            raise ValueError(f"Too many dates: at most {MAX_SCHEDULE_DATES} schedules can be generated at once")
+        
+        for offset in range(days):
+            target_date = first + timedelta(days=offset)
+            if target_date not in target_dates:
+                target_dates.append(target_date)
+    
+    return target_dates
+
+
+def load_meeting_room_emails(filename='meeting_room_emails.txt'):
+    """Load meeting room email addresses from file.
+    
+    Returns:
+        frozenset of lowercased email addresses
+    """
+    try:
+        # Read and lowercase the file in one go, then skip empty lines and comments
+        with open(filename, 'r', encoding='utf-8') as f:
+            lines = f.read().lower().splitlines()
+        room_emails = frozenset(
+            email for email in map(str.strip, lines)
+            if email and not email.startswith('#')
+        )
+    except FileNotFoundError:
+        print(f"Meeting room emails file '{filename}' not found, no rooms will be filtered")
+        return frozenset()
+    except Exception as e:
+        print(f"Warning: Failed to load meeting room emails: {str(e)}")
+        return frozenset()
+    
+    print(f"Loaded {len(room_emails)} meeting room email(s) from {filename}")
+    return room_emails
+
+
+def get_partstat_indicator(partstat):
+    """Get Unicode indicator for participant status.
+    
+    Args:
+        partstat: PARTSTAT parameter value from iCalendar (ACCEPTED, DECLINED, NEEDS-ACTION, TENTATIVE, etc.)
+    
+    Returns:
+        Unicode character representing the status
+    """
+    if not partstat:
+        return '○'  # Circle for no response/needs action
+    
+    # NEEDS-ACTION or unknown status is shown as a circle
+    return PARTSTAT_INDICATORS.get(partstat.upper(), '○')
+
+
+def abbreviate_name(full_name):
+    """Abbreviate a full name to 'Фамилия И.О.' format.
+    
+    'Иванов Иван Васильевич' -> 'Иванов И.В.'
+    'Иванов Иван' -> 'Иванов И.'
+    'Иванов' -> 'Иванов'
+    """
+    parts = full_name.split()
+    if len(parts) <= 1:
+        return full_name
+    result = parts[0]
+    for part in parts[1:]:
+        if part:
+            result += f" {part[0]}."
+    return result
+
+
+@lru_cache(maxsize=4096)
+def strip_mailto(address):
+    """Normalize calendar user address: drop 'mailto:' prefix and lowercase.
+    
+    Cached, since the same organizer and attendees repeat across events.
+    """
+    if address[:7].lower() == 'mailto:':
+        address = address[7:]
+    return sys.intern(address.lower().strip())
+
+
+def to_local_time(value, tz):
+    """Convert datetime to local timezone; dates (all-day events) are returned as is.
+    
+    Naive datetimes are assumed to be in local time already.
+    """
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            return value.replace(tzinfo=tz)
+        return value.astimezone(tz)
+    return value
+
+
+@dataclass
+class ParsedEvent:
+    """Calendar event prepared for the schedule document.
+    
+    start/end are timezone-aware datetimes for timed events and dates for
+    all-day events. Attendees are dicts with 'name', 'email' (lowercased,
+    without mailto: prefix), 'partstat' and 'display' (abbreviated name, or
+    email if the name is unknown). details is the location and
+    participants line shown under the summary; it is filled in when
+    attendee names are resolved.
+    """
+    __slots__ = (
+        'start', 'end', 'is_all_day', 'summary', 'location', 'duration',
+        'required_attendees', 'optional_attendees', 'details'
+    )
+    
+    start: Optional[Union[datetime, date]]
+    end: Optional[Union[datetime, date]]
+    is_all_day: bool
+    summary: str
+    location: str
+    duration: Optional[timedelta]
+    required_attendees: List[dict]
+    optional_attendees: List[dict]
+    details: Optional[str]
+    
+    @property
+    def attendees(self):
+        """All attendees combined (required first, then optional)."""
+        return self.required_attendees + self.optional_attendees
+
+
+def parse_ical_datetime(value, params):
+    """Parse iCalendar DATE or DATE-TIME property value.
+    
+    Args:
+        value: Property value, e.g. '20261015', '20261015T070000Z' or '20261015T100000'
+        params: Property parameters (VALUE, TZID)
+    
+    Returns:
+        date for all-day values; timezone-aware datetime for UTC and TZID
+        values; naive datetime for floating time
+    
+    Raises:
+        ValueError: if the value is malformed or TZID is not a known IANA zone
+    """
+    value = value.strip()
+    if len(value) == 8 or params.get('VALUE', '').upper() == 'DATE':
+        return date(int(value[0:4]), int(value[4:6]), int(value[6:8]))
+    
+    if len(value) < 15 or value[8] not in 'Tt':
+        raise ValueError(f"Invalid DATE-TIME value: '{value}'")
+    
+    parsed = datetime(
+        int(value[0:4]), int(value[4:6]), int(value[6:8]),
+        int(value[9:11]), int(value[11:13]), int(value[13:15])
+    )
+    
+    if value[15:16] in ('Z', 'z'):
+        return parsed.replace(tzinfo=timezone.utc)
+    
+    tzid = params.get('TZID')
+    if tzid:
+        if ZoneInfo is None:
+            raise ValueError(f"TZID '{tzid}' requires Python 3.9+")
+        try:
+            return parsed.replace(tzinfo=ZoneInfo(tzid))
+        except (KeyError, ValueError):
+            raise ValueError(f"Unknown TZID: '{tzid}'")
+    
+    return parsed
+
+
+def scan_calendar_data(calendar_data):
+    """Extract schedule properties from VEVENT components of iCalendar text.
+    
+    Only the properties printed in the schedule are needed, so the calendar
+    data is scanned with regular expressions instead of being fully parsed.
+    
+    Returns:
+        list of dicts with 'start', 'end', 'summary', 'location', 'organizer'
+        and 'attendees' (list of (address, role, partstat) tuples)
+    
+    Raises:
+        ValueError: if an event has a recurrence rule or recurrence dates (the
+                    server did not expand recurring events) or a time that
+                    can't be parsed
+    """
+    # Unfold continuation lines before scanning
+    text = CONTENT_LINE_UNFOLD_RE.sub('', calendar_data)
+    
+    events = []
+    for component in VEVENT_RE.findall(text):
+        # Alarms may carry their own SUMMARY and ATTENDEE properties
+        component = VALARM_RE.sub('', component)
+        
+        event = {
+            'start': None, 'end': None, 'summary': None,
+            'location': None, 'organizer': None, 'attendees': []
+        }
+        
+        for name, param_text, value in VEVENT_PROPERTY_RE.findall(component):
+            name = name.upper()
+            params = {
+                key.upper(): param_value.strip('"')
+                for key, param_value in ICAL_PARAMETER_RE.findall(param_text)
+            }
+            
+            if name == 'ATTENDEE':
+                event['attendees'].append((value, params.get('ROLE'), params.get('PARTSTAT')))
+            elif name == 'DTSTART':
+                event['start'] = parse_ical_datetime(value, params)
+            elif name == 'DTEND':
+                event['end'] = parse_ical_datetime(value, params)
+            elif name == 'SUMMARY':
+                event['summary'] = unescape_text_value(value)
+            elif name == 'LOCATION':
+                event['location'] = unescape_text_value(value)
+            elif name == 'ORGANIZER':
+                event['organizer'] = value
+            else:  # RRULE or RDATE
+                raise ValueError("recurring event was not expanded by the server")
+        
+        events.append(event)
+    
+    return events
+
+
+def read_vobject_event(vevent):
+    """Extract schedule properties from a vobject VEVENT (same dict as scan_calendar_data)."""
+    return {
+        'start': vevent.dtstart.value if hasattr(vevent, 'dtstart') else None,
+        'end': vevent.dtend.value if hasattr(vevent, 'dtend') else None,
+        'summary': str(vevent.summary.value) if hasattr(vevent, 'summary') else None,
+        'location': str(vevent.location.value) if hasattr(vevent, 'location') else None,
+        'organizer': str(vevent.organizer.value) if hasattr(vevent, 'organizer') else None,
+        'attendees': [
+            (str(attendee.value), attendee.params.get('ROLE', [None])[0], attendee.params.get('PARTSTAT', [None])[0])
+            for attendee in vevent.contents.get('attendee', [])
+        ]
+    }
+
+
+def format_time_range(start, end):
+    """Format start/end attributes of CalDAV time-range and expand elements (in UTC)."""
+    return (
+        f'start="{start.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")}" '
+        f'end="{end.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")}"'
+    )
+
+
+def read_calendar_resources(response):
+    """Read calendar objects from a streamed calendar-query or calendar-multiget response.
+    
+    Returns:
+        dict: {href: {'etag': ..., 'events': [event dicts, see scan_calendar_data]}}
     
-    return email_to_name
+    Raises:
+        ValueError: if the server did not expand recurring events (see scan_calendar_data)
+    """
+    resources = {}
+    for resp in iter_dav_responses(response):
+        calendar_data = CALENDAR_DATA_XPATH(resp)
+        if calendar_data:
+            resources[HREF_XPATH(resp)] = {
+                'etag': GETETAG_XPATH(resp) or None,
+                'events': scan_calendar_data(calendar_data)
+            }
+    return resources
 
 
-def print_document(filepath):
-    """Print document to default printer (Windows only).
+def query_calendar_events(calendar, start, end):
+    """Fetch events in a time range with a single CalDAV calendar-query REPORT.
+    
+    The server is asked to expand recurring events into separate instances
+    and to return only the VEVENT properties used in the schedule, so the
+    response is small and can be scanned without full iCalendar parsing.
     
     Args:
-        filepath: Full path to the document to print
+        calendar: caldav Calendar object (provides URL and credentials)
+        start: Timezone-aware start of the time range
+        end: Timezone-aware end of the time range
     
     Returns:
-        bool: True if printing was initiated successfully, False otherwise
+        dict: {href: {'etag': ..., 'events': [...]}} (see read_calendar_resources),
+              or None if the query failed or the server did not expand recurring events
     """
-    # Check if running on Windows
-    if platform.system() != 'Windows':
-        print("Warning: Automatic printing is only supported on Windows")
-        return False
+    client = calendar.client
+    time_range = format_time_range(start, end)
+    
+    query_body = f'''<?xml version="1.0" encoding="utf-8" ?>
+   <C:calendar-query xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav">
+     <D:prop>
+       <D:getetag/>
+       {CALENDAR_DATA_REQUEST.format(time_range=time_range)}
+     </D:prop>
+     <C:filter>
+       <C:comp-filter name="VCALENDAR">
+         <C:comp-filter name="VEVENT">
+           <C:time-range {time_range}/>
+         </C:comp-filter>
+       </C:comp-filter>
+     </C:filter>
+   </C:calendar-query>'''
     
     try:
-        # Use os.startfile with 'print' verb to print the document
-        # This opens the document with the default print action
-        os.startfile(filepath, 'print')
-        print(f"Document sent to default printer: {filepath}")
-        return True
+        with SESSION.request(
+            'REPORT',
+            str(calendar.url),
+            headers={'Depth': '1', 'Content-Type': 'application/xml; charset=utf-8'},
+            data=query_body.encode('utf-8'),
+            auth=client.auth or HTTPBasicAuth(client.username, client.password),
+            timeout=60,
+            stream=True
+        ) as response:
+            if response.status_code not in [200, 207]:
+                print(f"Warning: REPORT calendar-query failed with status {response.status_code}")
+                return None
+            
+            return read_calendar_resources(response)
+    
     except Exception as e:
-        print(f"Error printing document: {str(e)}")
-        return False
+        print(f"Warning: Failed to query calendar events: {str(e)}")
+        return None
 
 
-def parse_date_argument(date_arg):
-    """Parse date argument from command line.
+def list_calendar_etags(calendar, start, end):
+    """List calendar objects with events in a time range, without their calendar data.
     
-    Supported formats:
-    - DD.MM.YY or DD.MM.YYYY - specific date
-    - DD.MM - day and month of current year
-    - integer (0, -1, +1, etc.) - offset from today
+    Returns:
+        dict: {href: etag}, or None if the query failed
     """
-    if not date_arg:
-        return datetime.now().date()
-    
-    # Try to parse as integer offset
-    try:
-        offset = int(date_arg)
-        return datetime.now().date() + timedelta(days=offset)
-    except ValueError:
-        pass
+    client = calendar.client
     
-    # Try to parse as date string
-    today = datetime.now()
-    
-    # Try different date formats
-    for fmt in ['%d.%m.%Y', '%d.%m.%y', '%d.%m']:
-        try:
-            if fmt == '%d.%m':
-                # For DD.MM format, use current year
-                parsed = datetime.strptime(date_arg, fmt)
-                return parsed.replace(year=today.year).date()
-            else:
-                return datetime.strptime(date_arg, fmt).date()
-        except ValueError:
-            continue
+    query_body = f'''<?xml version="1.0" encoding="utf-8" ?>
+   <C:calendar-query xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav">
+     <D:prop>
+       <D:getetag/>
+     </D:prop>
+     <C:filter>
+       <C:comp-filter name="VCALENDAR">
+         <C:comp-filter name="VEVENT">
+           <C:time-range {format_time_range(start, end)}/>
+         </C:comp-filter>
+       </C:comp-filter>
+     </C:filter>
+   </C:calendar-query>'''
     
-    # If nothing worked, raise error
-    raise ValueError(
-        f"Invalid date format: '{date_arg}'. "
-        "Use DD.MM.YY, DD.MM.YYYY, DD.MM, or integer offset (0, -1, +1, etc.)"
-    )
-
-
-def load_meeting_room_emails(filename='meeting_room_emails.txt'):
-    """Load meeting room email addresses from file."""
-    room_emails = set()
+    etags = {}
     
     try:
-        if os.path.exists(filename):
-            with open(filename, 'r', encoding='utf-8') as f:
-                for line in f:
-                    email = line.strip().lower()
-                    if email:  # Skip empty lines
-                        room_emails.add(email)
-            print(f"Loaded {len(room_emails)} meeting room email(s) from {filename}")
-        else:
-            print(f"Meeting room emails file '{filename}' not found, no rooms will be filtered")
+        with SESSION.request(
+            'REPORT',
+            str(calendar.url),
+            headers={'Depth': '1', 'Content-Type': 'application/xml; charset=utf-8'},
+            data=query_body.encode('utf-8'),
+            auth=client.auth or HTTPBasicAuth(client.username, client.password),
+            timeout=30,
+            stream=True
+        ) as response:
+            if response.status_code not in [200, 207]:
+                print(f"Warning: REPORT calendar-query failed with status {response.status_code}")
+                return None
+            
+            for resp in iter_dav_responses(response):
+                href_text = HREF_XPATH(resp)
+                if href_text:
+                    etags[href_text] = GETETAG_XPATH(resp) or None
+    
     except Exception as e:
-        print(f"Warning: Failed to load meeting room emails: {str(e)}")
+        print(f"Warning: Failed to list calendar events: {str(e)}")
+        return None
     
-    return room_emails
+    return etags
 
 
-def get_partstat_indicator(partstat):
-    """Get Unicode indicator for participant status.
+def multiget_calendar_events(calendar, hrefs, start, end):
+    """Fetch the given calendar objects with a single calendar-multiget REPORT.
     
-    Args:
-        partstat: PARTSTAT parameter value from iCalendar (ACCEPTED, DECLINED, NEEDS-ACTION, TENTATIVE, etc.)
+    Recurring events are expanded to the time range, as in query_calendar_events.
     
     Returns:
-        Unicode character representing the status
+        dict: {href: {'etag': ..., 'events': [...]}} (see read_calendar_resources),
+              or None if the request failed or the server did not expand recurring events
     """
-    if not partstat:
-        return '○'  # Circle for no response/needs action
+    client = calendar.client
+    
+    href_elements = ''.join([f'<D:href>{escape(href)}</D:href>' for href in hrefs])
+    
+    multiget_body = f'''<?xml version="1.0" encoding="utf-8" ?>
+   <C:calendar-multiget xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav">
+     <D:prop>
+       <D:getetag/>
+       {CALENDAR_DATA_REQUEST.format(time_range=format_time_range(start, end))}
+     </D:prop>
+     {href_elements}
+   </C:calendar-multiget>'''
     
-    partstat_upper = partstat.upper()
+    try:
+        with SESSION.request(
+            'REPORT',
+            str(calendar.url),
+            headers={'Depth': '1', 'Content-Type': 'application/xml; charset=utf-8'},
+            data=multiget_body.encode('utf-8'),
+            auth=client.auth or HTTPBasicAuth(client.username, client.password),
+            timeout=60,
+            stream=True
+        ) as response:
+            if response.status_code not in [200, 207]:
+                print(f"Warning: REPORT calendar-multiget failed with status {response.status_code}")
+                return None
+            
+            return read_calendar_resources(response)
     
-    if partstat_upper == 'ACCEPTED':
-        return '✓'  # Checkmark for accepted
-    elif partstat_upper == 'DECLINED':
-        return '✗'  # Cross for declined
-    elif partstat_upper == 'TENTATIVE':
-        return '?'  # Question mark for tentative
-    elif partstat_upper == 'DELEGATED':
-        return '→'  # Arrow for delegated
-    else:  # NEEDS-ACTION or unknown
-        return '○'  # Circle for needs action
+    except Exception as e:
+        print(f"Warning: Failed to fetch calendar events: {str(e)}")
+        return None
 
 
-def abbreviate_name(full_name):
-    """Abbreviate a full name to 'Фамилия И.О.' format.
+def event_to_json(event):
+    """Convert an event dict (see scan_calendar_data) to a JSON-serializable dict."""
+    return {
+        **event,
+        'start': event['start'].isoformat() if event['start'] is not None else None,
+        'end': event['end'].isoformat() if event['end'] is not None else None
+    }
+
+
+def event_from_json(data):
+    """Convert a dict produced by event_to_json back to an event dict."""
+    def parse_time(value):
+        if value is None:
+            return None
+        # Dates (all-day events) are serialized as YYYY-MM-DD
+        if len(value) == 10:
+            return date.fromisoformat(value)
+        return datetime.fromisoformat(value)
     
-    'Иванов Иван Васильевич' -> 'Иванов И.В.'
-    'Иванов Иван' -> 'Иванов И.'
-    'Иванов' -> 'Иванов'
-    """
-    parts = full_name.split()
-    if len(parts) <= 1:
-        return full_name
-    result = parts[0]
-    for part in parts[1:]:
-        if part:
-            result += f" {part[0]}."
-    return result
+    return {
+        **data,
+        'start': parse_time(data['start']),
+        'end': parse_time(data['end']),
+        'attendees': [tuple(attendee) for attendee in data['attendees']]
+    }
 
 
-def resolve_attendee_name(attendee_email, email_to_name):
-    """Resolve attendee email to full name from addressbook."""
-    # Clean email address
-    email = attendee_email.lower().strip()
+def load_calendar_events(calendar, start, end, cache_path=None):
+    """Fetch events in a time range, reusing cached events of unchanged calendar objects.
     
-    # Remove mailto: prefix if present
-    if email.startswith('mailto:'):
-        email = email[7:]
+    If cache_path is given and the time range has been fetched before, only the
+    ETags of the matching calendar objects are listed; new and changed objects
+    are fetched with calendar-multiget and the rest are taken from the cache.
     
-    # Try to find in addressbook
-    if email in email_to_name:
-        return email_to_name[email]
+    Returns:
+        list of event dicts (see scan_calendar_data), or None if the events could
+        not be fetched or the server did not expand recurring events
+    """
+    # Cache: {'version': ..., calendar_url: {time_range: {href: {'etag': ..., 'events': [...]}}}}
+    cache = load_json_cache(cache_path)
+    if cache.get('version') != EVENTS_CACHE_VERSION:
+        cache = {'version': EVENTS_CACHE_VERSION}
+    calendar_key = str(calendar.url)
+    range_key = (
+        f"{start.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}/"
+        f"{end.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}"
+    )
+    cached = cache.get(calendar_key, {}).get(range_key) if cache_path else None
+    
+    resources = None
+    changed = True
+    
+    if cached:
+        etags = list_calendar_etags(calendar, start, end)
+        if etags is not None:
+            modified = [
+                href for href, etag in etags.items()
+                if not etag or href not in cached or cached[href]['etag'] != etag
+            ]
+            fetched = multiget_calendar_events(calendar, modified, start, end) if modified else {}
+            
+            # Some servers return no data for calendar-multiget with expand;
+            # the full calendar-query below is used then
+            if fetched is not None and all(href in fetched for href in modified):
+                resources = {
+                    href: {'etag': cached[href]['etag'], 'events': [event_from_json(e) for e in cached[href]['events']]}
+                    for href in etags if href not in modified
+                }
+                resources.update(fetched)
+                changed = bool(modified) or len(etags) != len(cached)
+                print(f"  {len(etags) - len(modified)} unchanged calendar object(s) reused from cache")
+    
+    if resources is None:
+        resources = query_calendar_events(calendar, start, end)
+        if resources is None:
+            return None
+    
+    if cache_path and changed:
+        # Keep only the most recently fetched time ranges
+        ranges = cache.setdefault(calendar_key, {})
+        ranges.pop(range_key, None)
+        ranges[range_key] = {
+            href: {'etag': resource['etag'], 'events': [event_to_json(e) for e in resource['events']]}
+            for href, resource in resources.items()
+        }
+        while len(ranges) > MAX_CACHED_EVENT_RANGES:
+            del ranges[next(iter(ranges))]
+        save_json_cache(cache_path, cache)
     
-    # If not found, return the original email
-    return attendee_email
+    return [event for resource in resources.values() for event in resource['events']]
 
 
-def get_events_for_date(calendar, target_date, tz, email_to_name=None, room_emails=None):
-    """Fetch events for a specific date."""
+def get_events_for_date(calendar, target_date, tz, email_to_name=None, room_emails=None, cache_path=None):
+    """Fetch events for a specific date.
+    
+    If cache_path is given, parsed events are cached on disk and reused for
+    calendar objects whose ETag has not changed.
+    """
     # Initialize room_emails as empty set if not provided
     if room_emails is None:
-        room_emails = set()
+        room_emails = frozenset()
     
-    # Convert target_date to datetime with timezone
-    start_of_day = datetime.combine(target_date, datetime.min.time()).replace(tzinfo=tz)
+    # Day bounds in local time, computed once; with an IANA zone the end is the
+    # next local midnight, so the window is 23 or 25 hours long on DST changes
+    start_of_day = datetime.combine(target_date, time.min, tzinfo=tz)
     end_of_day = start_of_day + timedelta(days=1)
     
+    # Sort keys: all-day events go at the beginning of their day, events
+    # without a start at the end of the list
+    no_start_key = datetime.max.replace(tzinfo=tz)
+    
     # Fetch events
-    events = calendar.date_search(
-        start=start_of_day,
-        end=end_of_day,
-        expand=True
-    )
+    raw_events = load_calendar_events(calendar, start_of_day, end_of_day, cache_path)
+    if raw_events is None:
+        # Fall back to the caldav library, which expands recurring events on the client
+        # side and returns each instance as a separate object
+        print("Falling back to full calendar-data download")
+        raw_events = []
+        for event in calendar.search(start=start_of_day, end=end_of_day, event=True, expand=True):
+            try:
+                raw_events.append(read_vobject_event(event.vobject_instance.vevent))
+            except Exception as e:
+                print(f"Warning: Failed to parse event: {str(e)}")
     
     # Parse and sort events
-    parsed_events = []
-    for event in events:
+    keyed_events = []
+    for raw_event in raw_events:
         try:
-            vevent = event.vobject_instance.vevent
-            
-            # Extract start time
-            start_value = vevent.dtstart.value if hasattr(vevent, 'dtstart') else None
-            end_value = vevent.dtend.value if hasattr(vevent, 'dtend') else None
+            # Extract start and end time, converted to local timezone
+            start_value = to_local_time(raw_event['start'], tz)
+            end_value = to_local_time(raw_event['end'], tz)
             
             # Check if it's an all-day event
             is_all_day = False
             if start_value and not isinstance(start_value, datetime):
                 is_all_day = True
             
-            # Extract event details
-            event_data = {
-                'start': start_value,
-                'end': end_value,
-                'is_all_day': is_all_day,
-                'summary': str(vevent.summary.value) if hasattr(vevent, 'summary') else 'Без темы',
-                'location': str(vevent.location.value) if hasattr(vevent, 'location') else '',
-                'attendees': []
-            }
+            # Attendees not listed in the schedule: meeting rooms and the organizer
+            if raw_event['organizer'] is not None:
+                excluded_emails = room_emails | {strip_mailto(raw_event['organizer'])}
+            else:
+                excluded_emails = room_emails
             
-            # Extract organizer email
-            organizer_email = None
-            if hasattr(vevent, 'organizer'):
-                organizer_str = str(vevent.organizer.value)
-                if organizer_str.startswith('mailto:'):
-                    organizer_email = organizer_str[7:].lower()
-                else:
-                    organizer_email = organizer_str.lower()
-            
-            # Extract attendees (excluding room emails and organizer) with their roles and participation status
-            attendee_data = []  # Will store dicts with email, role, and partstat
-            if hasattr(vevent, 'attendee_list'):
-                for attendee in vevent.attendee_list:
-                    # Extract email from attendee
-                    attendee_str = str(attendee.value)
-                    if attendee_str.startswith('mailto:'):
-                        attendee_email = attendee_str[7:]
-                    else:
-                        attendee_email = attendee_str
-                    
-                    # Skip meeting room emails and organizer
-                    if attendee_email.lower() not in room_emails and attendee_email.lower() != organizer_email:
-                        # Extract ROLE and PARTSTAT parameters if available
-                        role = None
-                        partstat = None
-                        if hasattr(attendee, 'params'):
-                            role = attendee.params.get('ROLE', [None])[0]
-                            partstat = attendee.params.get('PARTSTAT', [None])[0]
-                        attendee_data.append({'email': attendee_email, 'role': role, 'partstat': partstat})
-            elif hasattr(vevent, 'attendee'):
-                attendee = vevent.attendee
-                attendee_str = str(attendee.value)
-                if attendee_str.startswith('mailto:'):
-                    attendee_email = attendee_str[7:]
-                else:
-                    attendee_email = attendee_str
-                
-                # Skip meeting room emails and organizer
-                if attendee_email.lower() not in room_emails and attendee_email.lower() != organizer_email:
-                    # Extract ROLE and PARTSTAT parameters if available
-                    role = None
-                    partstat = None
-                    if hasattr(attendee, 'params'):
-                        role = attendee.params.get('ROLE', [None])[0]
-                        partstat = attendee.params.get('PARTSTAT', [None])[0]
-                    attendee_data.append({'email': attendee_email, 'role': role, 'partstat': partstat})
-            
-            # Resolve attendee names from addressbook and separate by role
+            # Separate attendees by role, excluding room emails and organizer
+            # (names are resolved later from addressbook)
             required_attendees = []
             optional_attendees = []
             
-            for att_data in attendee_data:
-                email = att_data['email']
-                role = att_data['role']
-                partstat = att_data['partstat']
+            for address, role, partstat in raw_event['attendees']:
+                # Extract email from attendee, normalized once for lookups and comparisons
+                attendee_email = strip_mailto(address)
                 
-                # Resolve name if possible
-                resolved_name = None
-                if email_to_name:
-                    resolved_name = resolve_attendee_name(email, email_to_name)
-                    # Check if name was resolved (different from email)
-                    if resolved_name == email:
-                        resolved_name = None
+                # Skip meeting room emails and organizer
+                if attendee_email in excluded_emails:
+                    continue
                 
-                attendee_info = {'name': resolved_name, 'email': email, 'partstat': partstat}
+                attendee_info = {'name': None, 'email': attendee_email, 'partstat': partstat, 'display': attendee_email}
                 
                 # Classify by role: OPT-PARTICIPANT is optional, everything else is required
                 if role == 'OPT-PARTICIPANT':
@@ -585,108 +1662,286 @@ def get_events_for_date(calendar, target_date, tz, email_to_name=None, room_emai
                 else:
                     required_attendees.append(attendee_info)
             
-            # Sort each group alphabetically by name or email
-            required_attendees.sort(key=lambda x: x['name'] if x['name'] else x['email'])
-            optional_attendees.sort(key=lambda x: x['name'] if x['name'] else x['email'])
-            
-            event_data['required_attendees'] = required_attendees
-            event_data['optional_attendees'] = optional_attendees
-            # Keep 'attendees' for backward compatibility (all attendees combined)
-            event_data['attendees'] = required_attendees + optional_attendees
-            
-            # Handle datetime objects for start
-            if event_data['start']:
-                if isinstance(event_data['start'], datetime):
-                    # If it's a datetime, convert to local timezone
-                    if event_data['start'].tzinfo is None:
-                        event_data['start'] = event_data['start'].replace(tzinfo=tz)
-                    else:
-                        event_data['start'] = event_data['start'].astimezone(tz)
-                else:
-                    # If it's a date (all-day event), keep as date
-                    pass
-            
-            # Handle datetime objects for end
-            if event_data['end']:
-                if isinstance(event_data['end'], datetime):
-                    # If it's a datetime, convert to local timezone
-                    if event_data['end'].tzinfo is None:
-                        event_data['end'] = event_data['end'].replace(tzinfo=tz)
-                    else:
-                        event_data['end'] = event_data['end'].astimezone(tz)
-                else:
-                    # If it's a date (all-day event), keep as date
-                    pass
-            
             # Calculate duration if not all-day
-            if not is_all_day and event_data['start'] and event_data['end']:
-                duration = event_data['end'] - event_data['start']
-                event_data['duration'] = duration
+            if not is_all_day and start_value and end_value:
+                duration = end_value - start_value
+            else:
+                duration = None
+            
+            if not start_value:
+                sort_key = no_start_key
+            elif is_all_day:
+                # Most all-day events start on the target date itself
+                if start_value == target_date:
+                    sort_key = start_of_day
+                else:
+                    sort_key = datetime.combine(start_value, time.min, tzinfo=tz)
             else:
-                event_data['duration'] = None
+                sort_key = start_value
             
-            parsed_events.append(event_data)
+            keyed_events.append((sort_key, ParsedEvent(
+                start=start_value,
+                end=end_value,
+                is_all_day=is_all_day,
+                summary=raw_event['summary'] if raw_event['summary'] is not None else 'Без темы',
+                location=raw_event['location'] or '',
+                duration=duration,
+                required_attendees=required_attendees,
+                optional_attendees=optional_attendees,
+                details=None
+            )))
         
         except Exception as e:
             print(f"Warning: Failed to parse event: {str(e)}")
             continue
     
-    # Sort events by start time
-    def sort_key(x):
-        if x['start']:
-            if isinstance(x['start'], datetime):
-                return x['start']
-            else:
-                # For all-day events, put them at the beginning
-                return datetime.combine(x['start'], datetime.min.time()).replace(tzinfo=tz)
-        return datetime.max.replace(tzinfo=tz)
+    # Sort events by the key computed while parsing (stable for equal starts)
+    keyed_events.sort(key=itemgetter(0))
+    parsed_events = [event for _, event in keyed_events]
     
-    parsed_events.sort(key=sort_key)
+    resolve_event_attendees(parsed_events, email_to_name)
     
     return parsed_events
 
 
+def collect_attendee_emails(events):
+    """Collect unique attendee emails from parsed events."""
+    emails = set()
+    for event in events:
+        for attendee in event.attendees:
+            emails.add(attendee['email'])
+    return emails
+
+
+def format_event_details(event):
+    """Format the location and participants line of an event.
+    
+    Attendees are shown by their 'display' string: abbreviated name if
+    available, otherwise email.
+    
+    Returns:
+        str: e.g. "Room 1, ответственные Иванов И.И., a@b.c", or None if
+             the event has neither location nor attendees
+    """
+    details = event.location
+    
+    # Collect all attendees (required + optional)
+    all_attendees = event.attendees
+    
+    if all_attendees:
+        # Add "ответственные" label before the list, after the location if any
+        participants = "ответственные " + ', '.join([attendee['display'] for attendee in all_attendees])
+        details = f"{details}, {participants}" if details else participants
+    
+    return details or None
+
+
+def resolve_event_attendees(events, email_to_name=None):
+    """Resolve attendee names from addressbook and sort attendees of each event.
+    
+    Also formats each event's details line, so that building the document
+    only has to emit XML.
+    """
+    for event in events:
+        for attendee in event.attendees:
+            # Emails are normalized (lowercased, no mailto:) when events are parsed
+            attendee['name'] = email_to_name.get(attendee['email']) if email_to_name else None
+            attendee['display'] = abbreviate_name(attendee['name']) if attendee['name'] else attendee['email']
+        
+        # Sort each group alphabetically by name or email
+        event.required_attendees.sort(key=lambda x: x['name'] if x['name'] else x['email'])
+        event.optional_attendees.sort(key=lambda x: x['name'] if x['name'] else x['email'])
+        
+        event.details = format_event_details(event)
+
+
+def format_hhmm(value):
+    """Format time of day as HH:MM (faster than strftime, no locale handling)."""
+    return f"{value.hour:02d}:{value.minute:02d}"
+
+
+@lru_cache(maxsize=256)
+def format_duration(total_seconds):
+    """Format a duration in seconds as "H ч M мин".
+    
+    Cached, since meeting lengths repeat (30, 60, 90 minutes...).
+    """
+    hours = total_seconds // 3600
+    minutes = (total_seconds % 3600) // 60
+    
+    if hours > 0 and minutes > 0:
+        return f"{hours} ч {minutes} мин"
+    elif hours > 0:
+        return f"{hours} ч"
+    elif minutes > 0:
+        return f"{minutes} мин"
+    return "0 мин"
+
+
 def format_time_cell(event):
     """Format time cell with start time, end time, and duration."""
-    if event['is_all_day']:
+    if event.is_all_day:
         return 'Весь день'
     
-    if not event['start']:
+    if not event.start:
         return ''
     
-    # Format start time
-    time_str = event['start'].strftime('%H:%M')
-    
-    # Add end time if available
-    if event['end']:
-        time_str += ' - ' + event['end'].strftime('%H:%M')
+    # Start time, end time if available
+    parts = [format_hhmm(event.start)]
+    if event.end:
+        parts.append(f" - {format_hhmm(event.end)}")
     
     # Add duration if available (on a new line)
-    if event['duration']:
-        total_seconds = int(event['duration'].total_seconds())
-        hours = total_seconds // 3600
-        minutes = (total_seconds % 3600) // 60
-        
-        if hours > 0 and minutes > 0:
-            duration_str = f"{hours} ч {minutes} мин"
-        elif hours > 0:
-            duration_str = f"{hours} ч"
-        elif minutes > 0:
-            duration_str = f"{minutes} мин"
-        else:
-            duration_str = "0 мин"
-        
-        time_str += f"\n({duration_str})"
+    if event.duration:
+        parts.append(f"\n({format_duration(int(event.duration.total_seconds()))})")
+    
+    return ''.join(parts)
+
+
+def append_table_row(tbl, template_tr):
+    """Append a copy of a template row to the table and return its cell paragraphs.
+    
+    Rows are copied with lxml instead of Table.add_row() and filled through
+    their w:p elements, so no python-docx row, cell or paragraph objects are
+    created per row.
+    
+    Args:
+        tbl: w:tbl element of the table
+        template_tr: Empty w:tr element with the cell widths set
+    
+    Returns:
+        tuple: w:p element of each cell
+    """
+    tr = deepcopy(template_tr)
+    tbl.append(tr)
+    return tuple(tc.find(W_P) for tc in tr.iterchildren(W_TC))
+
+
+@lru_cache(maxsize=None)
+def run_template(bold):
+    """Build an empty run (w:r) with run properties for the given bold setting.
+    
+    Cached, so the w:rPr subtree is built once per setting and only copied
+    for each run.
+    """
+    r = etree.Element(W_R, nsmap={'w': W_NS})
+    
+    if bold is not None:
+        b = etree.SubElement(etree.SubElement(r, W_RPR), W_B)
+        if not bold:
+            b.set(W_VAL, '0')
+    
+    return r
+
+
+def add_text_run(p, text, bold=None):
+    """Append a text run to a paragraph, building its XML directly with lxml.
+    
+    Same result as paragraph.add_run(text) followed by setting run.bold
+    (line breaks become w:br elements), without python-docx's per-element
+    schema lookups, which dominate the cost of filling large tables.
+    
+    Args:
+        p: w:p element of the paragraph
+        text: Run text, may contain '\n'
+        bold: True/False to set bold explicitly, None to inherit from style
+    """
+    r = deepcopy(run_template(bold))
+    p.append(r)
+    
+    for line_idx, line in enumerate(text.split('\n')):
+        if line_idx:
+            etree.SubElement(r, W_BR)
+        if line:
+            t = etree.SubElement(r, W_T)
+            t.text = line
+            # As python-docx does: preserve only leading/trailing whitespace
+            if line[0].isspace() or line[-1].isspace():
+                t.set(XML_SPACE, 'preserve')
+    
+    return r
+
+
+def add_event_details(p, event):
+    """Add the location and participants line of an event to the info paragraph (w:p).
+    
+    Shared by all-day and timed rows; the line itself is prepared by
+    format_event_details() when attendee names are resolved.
+    """
+    # Add the second line if there's any content (line break is part of the same run)
+    if event.details:
+        add_text_run(p, '\n' + event.details, bold=False)
+
+
+def schedule_content_hash(events, target_date, document_title):
+    """Hash everything the schedule document is built from.
+    
+    Returns:
+        str: hex digest that changes whenever the document would change
+    """
+    content = {
+        'layout': DOCUMENT_LAYOUT_VERSION,
+        'date': target_date.isoformat(),
+        'title': document_title,
+        'events': [asdict(event) for event in events]
+    }
+    return hashlib.blake2b(
+        json.dumps(content, sort_keys=True, default=str, ensure_ascii=False).encode('utf-8')
+    ).hexdigest()
+
+
+def save_document(doc, output_filename, compression_level=None):
+    """Save document, optionally with a custom zip (zlib) compression level.
+    
+    python-docx always compresses with the zlib default (6); level 1 is
+    several times faster on large documents for a slightly larger file.
+    
+    Args:
+        compression_level: 0-9, or None for the python-docx default
+    """
+    if compression_level is None:
+        doc.save(output_filename)
+        return
     
-    return time_str
+    # python-docx has no option for this: its package writer opens the zip through
+    # docx.opc.phys_pkg.ZipFile, which is replaced for the duration of the save
+    import docx.opc.phys_pkg as docx_phys_pkg
+    
+    original_zipfile = docx_phys_pkg.ZipFile
+    docx_phys_pkg.ZipFile = partial(original_zipfile, compresslevel=compression_level)
+    try:
+        doc.save(output_filename)
+    finally:
+        docx_phys_pkg.ZipFile = original_zipfile
 
 
-def create_word_document_compact(events, output_filename, target_date, document_title='Расписание'):
+def create_word_document_compact(events, output_filename, target_date, document_title='Расписание',
+                                 compression_level=None):
     """Create Word document with compact 2-column schedule table.
     
     First column (3 cm): Time range and duration
     Second column (remaining space): Event summary, location, and participants
+    
+    The content hash is stored next to the document (output_filename + '.hash');
+    if the document exists and the hash matches, it is not written again.
     """
+    content_hash = schedule_content_hash(events, target_date, document_title)
+    hash_path = output_filename + '.hash'
+    
+    try:
+        with open(hash_path, 'r', encoding='utf-8') as f:
+            previous_hash = f.read().strip()
+    except OSError:
+        previous_hash = None
+    
+    if previous_hash == content_hash and os.path.exists(output_filename):
+        print(f"Schedule unchanged: {output_filename}")
+        return
+    
+    from docx import Document
+    from docx.shared import Pt, Cm
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    
     doc = Document()
     
     # Set page margins to 1.5 cm
@@ -713,8 +1968,8 @@ def create_word_document_compact(events, output_filename, target_date, document_
         doc.add_paragraph('На сегодня встреч не запланировано.')
     else:
         # Separate all-day events from timed events
-        all_day_events = [e for e in events if e['is_all_day']]
-        timed_events = [e for e in events if not e['is_all_day']]
+        all_day_events = [e for e in events if e.is_all_day]
+        timed_events = [e for e in events if not e.is_all_day]
         
         # Create table without header
         table = doc.add_table(rows=0, cols=2)
@@ -722,132 +1977,70 @@ def create_word_document_compact(events, output_filename, target_date, document_
         table.autofit = False
         table.allow_autofit = False
         
+        # Set column widths once in the table grid (w:tblGrid); add_row() copies
+        # them into each new cell, so no per-cell pass is needed afterwards
+        # A4 page width is 21 cm, with 1.5 cm margins on each side = 18 cm available
+        # First column: 3 cm, Second column: 15 cm (18 - 3)
+        widths = [Cm(3), Cm(15)]
+        for column, width in zip(table.columns, widths):
+            column.width = width
+        
+        # Build one empty row with python-docx to get cells with the grid widths;
+        # every schedule row is an lxml copy of it (see append_table_row)
+        tbl = table._tbl
+        template_tr = table.add_row()._tr
+        tbl.remove(template_tr)
+        
         # Add all-day events in a single row if any exist
         if all_day_events:
-            row_cells = table.add_row().cells
+            time_paragraph, info_paragraph = append_table_row(tbl, template_tr)
             
             # FIRST COLUMN: "Весь день"
-            time_paragraph = row_cells[0].paragraphs[0]
-            time_paragraph.add_run('Весь день')
+            add_text_run(time_paragraph, 'Весь день')
             
             # SECOND COLUMN: All events info separated by newline
-            info_paragraph = row_cells[1].paragraphs[0]
-            
             for event_idx, event in enumerate(all_day_events):
-                if event_idx > 0:
-                    # Add blank line between events
-                    info_paragraph.add_run('\n')
-                
-                # Event summary (bold)
-                summary_run = info_paragraph.add_run(event['summary'])
-                summary_run.bold = True
+                # Event summary (bold), on a new line after the previous event
+                summary_text = f"\n{event.summary}" if event_idx > 0 else event.summary
+                add_text_run(info_paragraph, summary_text, bold=True)
                 
                 # Location and participants
-                location_and_participants = []
-                
-                if event['location']:
-                    location_and_participants.append(event['location'])
-                
-                # Collect all attendees (required + optional)
-                all_attendees = event.get('required_attendees', []) + event.get('optional_attendees', [])
-                
-                # Format attendees: use abbreviated name if available, otherwise email
-                if all_attendees:
-                    attendee_names = []
-                    for attendee in all_attendees:
-                        if attendee['name']:
-                            attendee_names.append(abbreviate_name(attendee['name']))
-                        else:
-                            attendee_names.append(attendee['email'])
-                    
-                    participants_str = "ответственные " + ', '.join(attendee_names)
-                    location_and_participants.append(participants_str)
-                
-                # Add the second line if there's any content
-                if location_and_participants:
-                    info_paragraph.add_run('\n')
-                    details_run = info_paragraph.add_run(', '.join(location_and_participants))
-                    details_run.bold = False
+                add_event_details(info_paragraph, event)
         
         # Add timed events to table
         for event in timed_events:
-            row_cells = table.add_row().cells
+            time_paragraph, info_paragraph = append_table_row(tbl, template_tr)
             
             # FIRST COLUMN: Time range and duration
-            time_paragraph = row_cells[0].paragraphs[0]
-            
-            if event['start'] and event['end']:
-                # Add time range on first line
-                time_range = f"{event['start'].strftime('%H:%M')} - {event['end'].strftime('%H:%M')}"
-                time_paragraph.add_run(time_range)
+            if event.start and event.end:
+                # Time range on first line
+                time_text = f"{format_hhmm(event.start)} - {format_hhmm(event.end)}"
                 
-                # Add duration on second line in parentheses
-                if event['duration']:
-                    total_seconds = int(event['duration'].total_seconds())
-                    hours = total_seconds // 3600
-                    minutes = (total_seconds % 3600) // 60
-                    
-                    if hours > 0 and minutes > 0:
-                        duration_str = f"{hours} ч {minutes} мин"
-                    elif hours > 0:
-                        duration_str = f"{hours} ч"
-                    elif minutes > 0:
-                        duration_str = f"{minutes} мин"
-                    else:
-                        duration_str = "0 мин"
-                    
-                    time_paragraph.add_run('\n')
-                    time_paragraph.add_run(f"({duration_str})")
+                # Duration on second line in parentheses
+                if event.duration:
+                    time_text += f"\n({format_duration(int(event.duration.total_seconds()))})"
+                
+                # Whole time cell is a single run
+                add_text_run(time_paragraph, time_text)
             
             # SECOND COLUMN: Summary, location, and participants
-            info_paragraph = row_cells[1].paragraphs[0]
-            
             # Line 1: Event summary (bold)
-            summary_run = info_paragraph.add_run(event['summary'])
-            summary_run.bold = True
+            add_text_run(info_paragraph, event.summary, bold=True)
             
             # Line 2: Location and participants
-            location_and_participants = []
-            
-            # Add location if present (use name only if available, otherwise email)
-            if event['location']:
-                location_and_participants.append(event['location'])
-            
-            # Collect all attendees (required + optional)
-            all_attendees = event.get('required_attendees', []) + event.get('optional_attendees', [])
-            
-            # Format attendees: use abbreviated name if available, otherwise email
-            if all_attendees:
-                attendee_names = []
-                for attendee in all_attendees:
-                    if attendee['name']:
-                        attendee_names.append(abbreviate_name(attendee['name']))
-                    else:
-                        attendee_names.append(attendee['email'])
-                
-                # Add "ответственные" label before the list
-                participants_str = "ответственные " + ', '.join(attendee_names)
-                location_and_participants.append(participants_str)
-            
-            # Add the second line if there's any content
-            if location_and_participants:
-                info_paragraph.add_run('\n')
-                details_run = info_paragraph.add_run(', '.join(location_and_participants))
-                details_run.bold = False
-        
-        # Set column widths
-        # A4 page width is 21 cm, with 1.5 cm margins on each side = 18 cm available
-        # First column: 3 cm, Second column: 15 cm (18 - 3)
-        widths = [Cm(3), Cm(15)]
-        
-        # Set width for each cell in each column
-        for row in table.rows:
-            for idx, width in enumerate(widths):
-                row.cells[idx].width = width
+            add_event_details(info_paragraph, event)
     
     # Save document
-    doc.save(output_filename)
+    save_document(doc, output_filename, compression_level)
     print(f"Schedule saved to: {output_filename}")
+    
+    # Replace the hash file atomically, so it never describes a partial write
+    try:
+        with open(hash_path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(content_hash)
+        os.replace(hash_path + '.tmp', hash_path)
+    except OSError as e:
+        print(f"Warning: Failed to write schedule hash: {str(e)}")
 
 
 def main():
@@ -865,24 +2058,39 @@ Date format examples:
   -d 15.11.2025     Specific date (DD.MM.YYYY)
   -d 15.11.25       Specific date (DD.MM.YY)
   -d 15.11          15th November of current year (DD.MM)
+  -d 0,+1           Today and tomorrow (one document per date)
+  -d 17.11..21.11   Every day from 17th to 21st November
 """
         )
         parser.add_argument(
             '-d', '--date',
             type=str,
             default=None,
-            help='Date for schedule (default: today). Format: DD.MM.YY, DD.MM.YYYY, DD.MM, or integer offset (0=today, -1=yesterday, +1=tomorrow)'
+            help='Date for schedule (default: today). Format: DD.MM.YY, DD.MM.YYYY, DD.MM, or integer offset (0=today, -1=yesterday, +1=tomorrow); several dates separated by commas and ranges FROM..TO are accepted'
         )
         parser.add_argument(
             '-p', '--print',
             action='store_true',
             help='Print document to default printer after saving (Windows only)'
         )
+        parser.add_argument(
+            '--refresh-contacts',
+            action='store_true',
+            help='Ignore cached CardDAV contacts and load them from the server again'
+        )
+        parser.add_argument(
+            '--no-names',
+            action='store_true',
+            help='Do not resolve attendee names via CardDAV, show email addresses (faster)'
+        )
         args = parser.parse_args()
         
         # If date is not provided, prompt for input with default value
         date_arg = args.date
-        if date_arg is None:
+        if date_arg is None and (sys.stdin is None or not sys.stdin.isatty()):
+            # Non-interactive run (scheduler, pipe, pythonw): don't wait for input, use today
+            date_arg = '0'
+        elif date_arg is None:
             # Get default date (today) in DD.MM.YY format
             default_date = datetime.now().strftime('%d.%m.%y')
             try:
@@ -894,57 +2102,105 @@ Date format examples:
                 print(f"\nИспользуется дата по умолчанию: {default_date}")
                 date_arg = default_date
         
-        # Parse target date
-        target_date = parse_date_argument(date_arg)
-        print(f"Generating schedule for: {target_date.strftime('%d.%m.%Y')}")
+        # Parse target dates
+        target_dates = parse_date_arguments(date_arg)
+        
+        # Date strings used in messages and in the output filename, formatted once per date:
+        # (date, DD.MM.YYYY, DD.MM.YY)
+        schedule_dates = [
+            (target_date, target_date.strftime('%d.%m.%Y'), target_date.strftime('%d.%m.%y'))
+            for target_date in target_dates
+        ]
+        print(f"Generating schedule for: {', '.join(date_long for _, date_long, _ in schedule_dates)}")
         
         # Load configuration
         print("Loading configuration...")
         config = load_config()
         
-        # Connect to calendar
-        print("Connecting to CalDAV server...")
-        calendar = connect_to_calendar(
-            config['caldav_url'],
-            config['caldav_username'],
-            config['caldav_password']
-        )
-        print(f"Connected to calendar: {calendar.name}")
-        
-        # Load meeting room emails
-        print("Loading meeting room emails...")
-        room_emails = load_meeting_room_emails()
-        
-        # Load contacts from CardDAV (optional)
-        email_to_name = {}
-        if config['carddav_url']:
-            print("Connecting to CardDAV server and loading contacts...")
-            email_to_name = load_contacts_from_carddav(
-                config['carddav_url'],
-                config['carddav_username'],
-                config['carddav_password']
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # Discover addressbooks on the CardDAV server while events are fetched from CalDAV
+            addressbooks_future = None
+            discovery_messages = []
+            if config['carddav_url'] and not args.no_names:
+                addressbooks_future = executor.submit(
+                    discover_addressbooks,
+                    config['carddav_url'],
+                    config['carddav_username'],
+                    config['carddav_password'],
+                    log=discovery_messages.append
+                )
+            
+            # Connect to calendar
+            print("Connecting to CalDAV server...")
+            calendar = connect_to_calendar(
+                config['caldav_url'],
+                config['caldav_username'],
+                config['caldav_password']
             )
-        else:
-            print("CardDAV URL not configured, skipping contact resolution")
-        
-        # Get events for target date
-        print(f"Fetching events for {target_date.strftime('%d.%m.%Y')}...")
-        events = get_events_for_date(calendar, target_date, config['timezone'], email_to_name, room_emails)
-        print(f"Found {len(events)} event(s)")
-        
-        # Generate output filename
-        filename = f"{config['filename_prefix']}{target_date.strftime('%d.%m.%y')}.docx"
-        output_path = os.path.join(config['output_path'], filename)
-        
-        # Create Word document
-        print("Creating Word document...")
-        create_word_document_compact(events, output_path, target_date, config['document_title'])
-        
-        # Print document if requested
-        if args.print:
-            print("\nSending document to printer...")
-            if not print_document(output_path):
-                print("Note: Document was saved but printing failed")
+            print(f"Connected to calendar: {calendar.name}")
+            
+            # Load meeting room emails
+            print("Loading meeting room emails...")
+            room_emails = load_meeting_room_emails()
+            
+            # Get events for each target date, reusing the calendar connection
+            events_by_date = []
+            for target_date, date_long, date_short in schedule_dates:
+                print(f"Fetching events for {date_long}...")
+                events = get_events_for_date(
+                    calendar,
+                    target_date,
+                    config['timezone'],
+                    room_emails=room_emails,
+                    cache_path=config['events_cache_path']
+                )
+                print(f"Found {len(events)} event(s)")
+                events_by_date.append((target_date, date_short, events))
+            
+            all_events = [event for _, _, events in events_by_date for event in events]
+            
+            # Resolve attendee names from CardDAV (optional), looking up only the attendees
+            # of the selected dates, with a single lookup for all of them
+            if addressbooks_future is not None:
+                print("Connecting to CardDAV server and resolving attendee names...")
+                addressbooks = addressbooks_future.result()
+                for message in discovery_messages:
+                    print(message)
+                email_to_name = load_contacts_from_carddav(
+                    config['carddav_url'],
+                    config['carddav_username'],
+                    config['carddav_password'],
+                    emails=collect_attendee_emails(all_events),
+                    cache_path=config['contacts_cache_path'],
+                    addressbooks=addressbooks,
+                    refresh=args.refresh_contacts
+                )
+                resolve_event_attendees(all_events, email_to_name)
+            elif args.no_names:
+                print("Attendee names not requested (--no-names), skipping contact resolution")
+            else:
+                print("CardDAV URL not configured, skipping contact resolution")
+        
+        for target_date, date_short, events in events_by_date:
+            # Generate output filename
+            filename = f"{config['filename_prefix']}{date_short}.docx"
+            output_path = os.path.join(config['output_path'], filename)
+            
+            # Create Word document
+            print("Creating Word document...")
+            create_word_document_compact(
+                events,
+                output_path,
+                target_date,
+                config['document_title'],
+                config['compression_level']
+            )
+            
+            # Print document if requested
+            if args.print:
+                print("\nSending document to printer...")
+                if not print_document(output_path):
+                    print("Note: Document was saved but printing failed")
         
         print("Done!")
         
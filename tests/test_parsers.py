@@ -0,0 +1,181 @@
+"""Tests for the regex-based iCalendar and vCard scanners."""
+
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+import print_schedule as ps
+
+
+def ical(*vevent_lines):
+    """Wrap VEVENT content lines into a CRLF-separated VCALENDAR object."""
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'BEGIN:VEVENT', *vevent_lines, 'END:VEVENT', 'END:VCALENDAR']
+    return '\r\n'.join(lines) + '\r\n'
+
+
+def vcard(*lines):
+    """Wrap content lines into a CRLF-separated vCard."""
+    return '\r\n'.join(['BEGIN:VCARD', 'VERSION:3.0', *lines, 'END:VCARD']) + '\r\n'
+
+
+# parse_ical_datetime
+
+def test_ical_datetime_utc():
+    assert ps.parse_ical_datetime('20261015T070000Z', {}) == datetime(2026, 10, 15, 7, 0, tzinfo=timezone.utc)
+
+
+def test_ical_datetime_date_value():
+    assert ps.parse_ical_datetime('20261015', {'VALUE': 'DATE'}) == date(2026, 10, 15)
+    assert ps.parse_ical_datetime('20261015', {}) == date(2026, 10, 15)
+
+
+def test_ical_datetime_floating():
+    value = ps.parse_ical_datetime('20261015T100000', {})
+    assert value == datetime(2026, 10, 15, 10, 0)
+    assert value.tzinfo is None
+
+
+@pytest.mark.skipif(ps.ZoneInfo is None, reason="zoneinfo requires Python 3.9+")
+def test_ical_datetime_tzid():
+    value = ps.parse_ical_datetime('20261015T100000', {'TZID': 'Europe/Moscow'})
+    assert value.utcoffset() == timedelta(hours=3)
+    assert value.astimezone(timezone.utc) == datetime(2026, 10, 15, 7, 0, tzinfo=timezone.utc)
+
+
+def test_ical_datetime_invalid():
+    with pytest.raises(ValueError):
+        ps.parse_ical_datetime('2026-10-15 10:00', {})
+
+
+# scan_calendar_data
+
+def test_scan_basic_event():
+    (event,) = ps.scan_calendar_data(ical(
+        'DTSTART:20261015T070000Z',
+        'DTEND:20261015T083000Z',
+        'SUMMARY:Планёрка',
+        'LOCATION:Переговорная 401',
+        'ORGANIZER;CN=Boss:mailto:boss@company.com',
+        'ATTENDEE;ROLE=REQ-PARTICIPANT;PARTSTAT=ACCEPTED:mailto:ivanov@company.com',
+    ))
+    assert event['start'] == datetime(2026, 10, 15, 7, 0, tzinfo=timezone.utc)
+    assert event['end'] == datetime(2026, 10, 15, 8, 30, tzinfo=timezone.utc)
+    assert event['summary'] == 'Планёрка'
+    assert event['location'] == 'Переговорная 401'
+    assert event['organizer'] == 'mailto:boss@company.com'
+    assert event['attendees'] == [('mailto:ivanov@company.com', 'REQ-PARTICIPANT', 'ACCEPTED')]
+
+
+def test_scan_unfolds_lines():
+    (event,) = ps.scan_calendar_data(ical(
+        'DTSTART:20261015T070000Z',
+        'SUMMARY:Очень длинное',
+        '  название встречи',
+        'ATTENDEE;PARTSTAT=TENTATIVE:mailto:long.address',
+        '\t@company.com',
+    ))
+    assert event['summary'] == 'Очень длинное название встречи'
+    assert event['attendees'] == [('mailto:long.address@company.com', None, 'TENTATIVE')]
+
+
+def test_scan_quoted_parameters_with_separators():
+    (event,) = ps.scan_calendar_data(ical(
+        'DTSTART:20261015T070000Z',
+        'ATTENDEE;CN="Doe; John: PM";ROLE=OPT-PARTICIPANT;PARTSTAT=DECLINED:mailto:john@x.org',
+        'ORGANIZER;CN="Team: Ops; Core":mailto:ops@x.org',
+    ))
+    assert event['attendees'] == [('mailto:john@x.org', 'OPT-PARTICIPANT', 'DECLINED')]
+    assert event['organizer'] == 'mailto:ops@x.org'
+
+
+def test_scan_unescapes_text():
+    (event,) = ps.scan_calendar_data(ical(
+        'DTSTART:20261015T070000Z',
+        'SUMMARY:Итоги\\, планы\\; задачи\\nвторая строка\\\\конец',
+        'LOCATION:Зал A\\, 3 этаж',
+    ))
+    assert event['summary'] == 'Итоги, планы; задачи\nвторая строка\\конец'
+    assert event['location'] == 'Зал A, 3 этаж'
+
+
+def test_scan_ignores_valarm_properties():
+    (event,) = ps.scan_calendar_data(ical(
+        'DTSTART:20261015T070000Z',
+        'BEGIN:VALARM',
+        'ACTION:EMAIL',
+        'SUMMARY:Reminder',
+        'ATTENDEE:mailto:alarm@company.com',
+        'END:VALARM',
+        'SUMMARY:Настоящая тема',
+    ))
+    assert event['summary'] == 'Настоящая тема'
+    assert event['attendees'] == []
+
+
+@pytest.mark.skipif(ps.ZoneInfo is None, reason="zoneinfo requires Python 3.9+")
+def test_scan_tzid_and_all_day():
+    timed, all_day = ps.scan_calendar_data(
+        'BEGIN:VCALENDAR\r\n'
+        'BEGIN:VEVENT\r\nDTSTART;TZID=Europe/Moscow:20261015T100000\r\n'
+        'DTEND;TZID=Europe/Moscow:20261015T110000\r\nEND:VEVENT\r\n'
+        'BEGIN:VEVENT\r\nDTSTART;VALUE=DATE:20261015\r\nDTEND;VALUE=DATE:20261016\r\nEND:VEVENT\r\n'
+        'END:VCALENDAR\r\n'
+    )
+    assert timed['start'].astimezone(timezone.utc) == datetime(2026, 10, 15, 7, 0, tzinfo=timezone.utc)
+    assert all_day['start'] == date(2026, 10, 15)
+    assert all_day['end'] == date(2026, 10, 16)
+
+
+@pytest.mark.parametrize('recurrence', ['RRULE:FREQ=WEEKLY', 'RDATE:20261015T070000Z'])
+def test_scan_rejects_unexpanded_recurrence(recurrence):
+    with pytest.raises(ValueError):
+        ps.scan_calendar_data(ical('DTSTART:20261001T070000Z', recurrence, 'SUMMARY:Серия'))
+
+
+def test_scan_lf_line_endings():
+    (event,) = ps.scan_calendar_data(ical('DTSTART:20261015T070000Z', 'SUMMARY:LF').replace('\r\n', '\n'))
+    assert event['summary'] == 'LF'
+
+
+# parse_vcard_contact
+
+def test_vcard_structured_name_preferred_over_fn():
+    full_name, emails = ps.parse_vcard_contact(vcard(
+        'N:Иванов;Иван;Васильевич;;',
+        'FN:Ваня Иванов',
+        'EMAIL;TYPE=work:Ivanov@Company.com',
+    ))
+    assert full_name == 'Иванов Иван Васильевич'
+    assert emails == ['ivanov@company.com']
+
+
+def test_vcard_fn_used_when_n_is_empty():
+    full_name, emails = ps.parse_vcard_contact(vcard('FN:Конференц-зал', 'N:;;;;', 'EMAIL:hall@company.com'))
+    assert full_name == 'Конференц-зал'
+    assert emails == ['hall@company.com']
+
+
+def test_vcard_grouped_emails():
+    full_name, emails = ps.parse_vcard_contact(vcard(
+        'N:Сидорова;Анна;;;',
+        'item1.EMAIL;type=INTERNET:anna@company.com',
+        'item1.X-ABLabel:work',
+        'item2.email:Anna.Home@example.org',
+    ))
+    assert full_name == 'Сидорова Анна'
+    assert emails == ['anna@company.com', 'anna.home@example.org']
+
+
+def test_vcard_folded_and_escaped_values():
+    full_name, emails = ps.parse_vcard_contact(vcard(
+        'N:O\\;Brien;Pat',
+        ' rick;;;',
+        'EMAIL:pat.obrien@',
+        ' example.org',
+    ))
+    assert full_name == 'O;Brien Patrick'
+    assert emails == ['pat.obrien@example.org']
+
+
+def test_vcard_without_name():
+    assert ps.parse_vcard_contact(vcard('EMAIL:nobody@company.com')) == (None, [])